@@ -0,0 +1,37 @@
+"""Gunicorn settings, picked up from the working directory.
+
+With ``METRICS_ENABLED`` the workers keep their Prometheus metrics in a
+directory shared with each other, so ``/metrics`` of any worker reports
+the whole server. The directory is emptied when the server starts and
+the files of exited workers are merged into the totals.
+"""
+
+import os
+import shutil
+import tempfile
+
+import environ
+
+env = environ.Env()
+
+if env.bool("METRICS_ENABLED", default=False):
+    os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR",
+        os.path.join(tempfile.gettempdir(), "prometheus"),
+    )
+
+
+def on_starting(server):
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Imported late: prometheus_client picks the multiprocess value
+        # class at import time, after the directory is set above.
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,90 @@
+from django.conf import settings
+from django.db.backends.postgresql import base
+
+from .. import slow_queries
+from .creation import DatabaseCreation
+from .pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend with connection health checks and pooling.
+
+    A persistent connection is checked with ``SELECT 1`` before its first
+    query in every request, so a connection dropped by Postgres or a
+    proxy is replaced instead of failing the request. With
+    ``DB_POOL_ENABLED`` connections come from a process-wide pool shared by
+    the threads of a worker and go back to it when Django closes them.
+    With ``SLOW_QUERY_LOG_ENABLED`` slow statements are logged with their
+    plans by ``main.slow_queries``.
+    """
+
+    creation_class = DatabaseCreation
+    health_check_done = False
+    pool = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if settings.SLOW_QUERY_LOG_ENABLED:
+            self.execute_wrappers.append(slow_queries.record)
+
+    def get_new_connection(self, conn_params):
+        if not settings.DB_POOL_ENABLED:
+            return super().get_new_connection(conn_params)
+
+        check = self._check_usable if settings.DB_HEALTH_CHECKS else None
+        self.pool = get_pool(self.alias, self.settings_dict["NAME"])
+        connection = self.pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            ),
+            check=check,
+        )
+        options = self.settings_dict["OPTIONS"]
+        self.isolation_level = options.get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def _close(self):
+        if self.connection is None or self.pool is None:
+            return super()._close()
+
+        if self.errors_occurred and not self.is_usable():
+            self.pool.discard(self.connection)
+        else:
+            self.pool.release(self.connection)
+        self.pool = None
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or self.health_check_done
+            or self.in_atomic_block
+            or not settings.DB_HEALTH_CHECKS
+        ):
+            return
+
+        self.health_check_done = True
+        if not self.is_usable():
+            self.close()
+
+    @staticmethod
+    def _check_usable(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except base.Database.Error:
+            return False
+        return True
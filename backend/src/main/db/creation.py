@@ -0,0 +1,11 @@
+from django.db.backends.postgresql import creation
+
+from .pool import close_pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    def _destroy_test_db(self, test_database_name, verbosity):
+        # Idle pooled connections to the test database would keep Postgres
+        # from dropping it.
+        close_pool(self.connection.alias, test_database_name)
+        super()._destroy_test_db(test_database_name, verbosity)
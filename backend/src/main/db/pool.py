@@ -0,0 +1,215 @@
+import logging
+import os
+import threading
+import time
+
+import psycopg2
+from django.conf import settings
+
+from main import metrics
+
+logger = logging.getLogger(__name__)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Process-wide set of connections to one database.
+
+    At most ``max_size`` connections are open at once; a thread that needs
+    one more waits up to ``timeout`` seconds for a free slot. Returned
+    connections are kept for reuse by other threads and are recycled once
+    they are older than ``max_age`` seconds.
+    """
+
+    def __init__(self, alias, max_size, timeout, max_age):
+        self.alias = alias
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.pid = os.getpid()
+
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._opened_at = {}
+        self._stats = {
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "opened": 0,
+            "reused": 0,
+            "recycled": 0,
+            "discarded": 0,
+        }
+
+    def acquire(self, connect, check=None):
+        """Return an idle connection or open one with ``connect()``.
+
+        ``check`` is called with an idle connection before it is handed
+        out; connections it rejects are closed and replaced.
+        """
+        started = time.monotonic()
+        acquired = self._slots.acquire(timeout=self.timeout)
+        waited = time.monotonic() - started
+        self._record_wait(waited, acquired)
+        if not acquired:
+            raise psycopg2.OperationalError(
+                f"connection pool {self.alias!r} exhausted: no free "
+                f"connection within {self.timeout}s"
+            )
+
+        try:
+            return self._checkout(connect, check)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection):
+        """Take back a connection the caller no longer uses."""
+        try:
+            if self._reusable(connection):
+                with self._lock:
+                    self._idle.append(connection)
+                return
+            self._close(connection)
+        finally:
+            self._slots.release()
+
+    def discard(self, connection):
+        """Close a connection that must not be reused."""
+        try:
+            self._close(connection)
+        finally:
+            self._slots.release()
+
+    def close_idle(self):
+        """Close the idle connections, e.g. before the database is dropped."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._close(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                "max_size": self.max_size,
+                "open": len(self._opened_at),
+                "idle": len(self._idle),
+                "in_use": len(self._opened_at) - len(self._idle),
+            }
+
+    def _checkout(self, connect, check):
+        while True:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+
+            if connection is None:
+                connection = connect()
+                with self._lock:
+                    self._opened_at[connection] = time.monotonic()
+                    self._stats["opened"] += 1
+                return connection
+
+            if self._expired(connection):
+                self._close(connection, stat="recycled")
+            elif check is not None and not check(connection):
+                self._close(connection, stat="discarded")
+            else:
+                with self._lock:
+                    self._stats["reused"] += 1
+                return connection
+
+    def _reusable(self, connection):
+        if connection.closed:
+            return False
+        if self._expired(connection):
+            return False
+        if connection.status != psycopg2.extensions.STATUS_READY:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                return False
+        return True
+
+    def _expired(self, connection):
+        if self.max_age is None:
+            return False
+        opened_at = self._opened_at.get(connection, 0.0)
+        return time.monotonic() - opened_at >= self.max_age
+
+    def _close(self, connection, stat=None):
+        with self._lock:
+            self._opened_at.pop(connection, None)
+            if stat is not None:
+                self._stats[stat] += 1
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _record_wait(self, waited, acquired):
+        with self._lock:
+            self._stats["waits"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(
+                self._stats["wait_time_max"], waited
+            )
+            if not acquired:
+                self._stats["timeouts"] += 1
+
+        metrics.db_pool_wait.labels(self.alias).observe(waited)
+        if not acquired:
+            metrics.db_pool_timeouts.labels(self.alias).inc()
+
+        if waited >= settings.DB_POOL_SLOW_WAIT:
+            logger.warning(
+                "Waited %.3fs for a connection to %r (%s)",
+                waited,
+                self.alias,
+                "acquired" if acquired else "timed out",
+            )
+
+
+def get_pool(alias, name):
+    """Return the pool of database ``name`` of ``alias`` for this process.
+
+    Pools are created lazily, so a gunicorn worker never shares the
+    connections of the process it was forked from, and are keyed by the
+    database name, so the test database never gets connections to the
+    real one.
+    """
+    key = (alias, name)
+    pool = _pools.get(key)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(
+                alias,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                timeout=settings.DB_POOL_TIMEOUT,
+                max_age=settings.DB_CONN_MAX_AGE,
+            )
+    return pool
+
+
+def close_pool(alias, name):
+    """Close the idle connections to database ``name`` of ``alias``."""
+    pool = _pools.get((alias, name))
+    if pool is not None and pool.pid == os.getpid():
+        pool.close_idle()
+
+
+def get_stats():
+    """Return the counters of every pool of the current process by alias."""
+    return {
+        alias: pool.stats()
+        for (alias, _), pool in list(_pools.items())
+        if pool.pid == os.getpid()
+    }
@@ -0,0 +1,65 @@
+"""Log files written by every gunicorn worker separately.
+
+``RotatingFileHandler`` rotates by renaming the file, which is only safe
+with one writer: with several workers on one file, each rotates on its
+own and the others keep writing to the renamed file or clobber the
+backups. ``WorkerFileHandler`` gives every process a file of its own,
+``name.<pid>.ext``, rotated with its own backups.
+"""
+
+import glob
+import os
+import re
+from logging.handlers import RotatingFileHandler
+
+
+def worker_path(path, pid=None):
+    root, extension = os.path.splitext(path)
+    return f"{root}.{os.getpid() if pid is None else pid}{extension}"
+
+
+def log_files(path):
+    """Return the files of all workers logging to ``path``, with backups.
+
+    A file at ``path`` itself, written before the logs were split per
+    worker, is included too.
+    """
+    root, extension = os.path.splitext(path)
+    pattern = re.compile(
+        rf"{re.escape(root)}(?:\.\d+)?{re.escape(extension)}(?:\.\d+)?"
+    )
+    return sorted(
+        name
+        for name in glob.glob(f"{glob.escape(root)}*")
+        if pattern.fullmatch(name)
+    )
+
+
+class WorkerFileHandler(RotatingFileHandler):
+    """Rotating file handler that writes to a file of the current process.
+
+    The file is opened on the first record, so a handler configured in
+    the gunicorn master before the fork still writes to the file of the
+    worker that logs.
+    """
+
+    def __init__(self, filename, *args, **kwargs):
+        self.path = os.path.abspath(filename)
+        self.pid = None
+        kwargs["delay"] = True
+        super().__init__(worker_path(self.path), *args, **kwargs)
+
+    def _open(self):
+        self.pid = os.getpid()
+        self.baseFilename = worker_path(self.path, self.pid)
+        return super()._open()
+
+    def emit(self, record):
+        if self.stream is not None and self.pid != os.getpid():
+            self.acquire()
+            try:
+                self.stream.close()
+                self.stream = None
+            finally:
+                self.release()
+        super().emit(record)
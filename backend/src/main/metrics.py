@@ -0,0 +1,100 @@
+"""Prometheus metrics of the API workers.
+
+Metrics are plain ``prometheus_client`` objects. Under gunicorn every
+worker writes its values to files in ``PROMETHEUS_MULTIPROC_DIR`` (see
+``gunicorn.conf.py``) and ``export()`` merges the files of all workers, so
+a scrape of any worker returns the totals of the whole server.
+"""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+NAMESPACE = "foodgram"
+UNMATCHED = "unmatched"
+
+requests_total = Counter(
+    "http_requests_total",
+    "API requests by view action, method and status.",
+    ["action", "method", "status"],
+    namespace=NAMESPACE,
+)
+request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time to build the response, by view action.",
+    ["action", "method"],
+    namespace=NAMESPACE,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+db_queries = Histogram(
+    "db_queries_per_request",
+    "Database queries run by one request, by view action.",
+    ["action"],
+    namespace=NAMESPACE,
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+db_duration = Histogram(
+    "db_duration_seconds",
+    "Time one request spent in the database, by view action.",
+    ["action"],
+    namespace=NAMESPACE,
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+cache_requests = Counter(
+    "cache_requests_total",
+    "Lookups of the recipe caches by result, hit or miss.",
+    ["cache", "result"],
+    namespace=NAMESPACE,
+)
+auth_lookups = Counter(
+    "auth_lookups_total",
+    "Credential checks by authentication backend and result.",
+    ["backend", "result"],
+    namespace=NAMESPACE,
+)
+db_pool_wait = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a free pooled connection.",
+    ["alias"],
+    namespace=NAMESPACE,
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+db_pool_timeouts = Counter(
+    "db_pool_timeouts_total",
+    "Requests for a pooled connection that timed out.",
+    ["alias"],
+    namespace=NAMESPACE,
+)
+
+
+def observe_request(request, response, timing, duration):
+    action = timing.action or UNMATCHED
+    requests_total.labels(action, request.method, response.status_code).inc()
+    request_duration.labels(action, request.method).observe(duration)
+    db_queries.labels(action).observe(timing.queries)
+    db_duration.labels(action).observe(timing.db)
+
+
+def count_cache(name, hits=0, misses=0):
+    if hits:
+        cache_requests.labels(name, "hit").inc(hits)
+    if misses:
+        cache_requests.labels(name, "miss").inc(misses)
+
+
+def export():
+    """Return the metrics of all workers and their content type."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
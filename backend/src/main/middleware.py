@@ -0,0 +1,133 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.permissions import SAFE_METHODS
+
+from . import metrics, slow_queries, timing
+from .routers import pin_to_primary, route_reads_to_replicas, stop_routing
+
+REPLICA_METHODS = ("GET", "HEAD")
+
+access_logger = logging.getLogger("main.access")
+
+
+class ReplicaRoutingMiddleware:
+    """Route safe requests of opted-in views to the read replicas.
+
+    A view opts in with ``use_read_replica = True``. After a successful
+    write the user is pinned to the primary so they read their own writes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_routing()
+
+        user = getattr(request, "user", None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            pin_to_primary(user)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None)
+        if request.method in REPLICA_METHODS and getattr(
+            view_class, "use_read_replica", False
+        ):
+            route_reads_to_replicas(request)
+
+
+class ServerTimingMiddleware:
+    """Report where the time of a request went.
+
+    Database, serializer, render and total time go to the ``Server-Timing``
+    header and to one JSON line of the ``main.access`` log, keyed by the
+    view action. With ``SERVER_TIMING_ENABLED`` off the middleware removes
+    itself from the chain at startup.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        timing.instrument_serializers()
+
+    def __call__(self, request):
+        with timing.track() as current:
+            response = self.get_response(request)
+
+        response["Server-Timing"] = current.header()
+        access_logger.info(current.log_line(request, response))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing.current().action = timing.action_name(request, view_func)
+
+    def process_template_response(self, request, response):
+        current = timing.current()
+        started = time.perf_counter()
+
+        def rendered(response):
+            current.render += time.perf_counter() - started
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class MetricsMiddleware:
+    """Record Prometheus metrics of every request by view action.
+
+    Requests that resolve to no view are counted as ``unmatched``. The
+    middleware shares the request timing with ``ServerTimingMiddleware``
+    when both are enabled, so it must come after it.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        current = timing.current()
+        if current is None:
+            with timing.track() as current:
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+
+        metrics.observe_request(
+            request, response, current, time.perf_counter() - started
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing.current().action = timing.action_name(request, view_func)
+
+
+class SlowQueryMiddleware:
+    """Tell the slow query log which view action issued a statement."""
+
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            slow_queries.set_action(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        slow_queries.set_action(timing.action_name(request, view_func))
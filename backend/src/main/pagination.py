@@ -1,5 +1,54 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class LimitPageNumberPaginator(PageNumberPagination):
     page_size_query_param = "limit"
+
+
+class LimitCursorPaginator(CursorPagination):
+    page_size_query_param = "limit"
+    ordering = "-id"
+
+
+class OptInCursorPaginator(LimitPageNumberPaginator):
+    """Page-number pagination that switches to keyset pagination on demand.
+
+    Clients opt in with ``?pagination=cursor`` and then follow the opaque
+    ``next``/``previous`` links. Keyset pages skip the ``COUNT(*)`` query
+    and never use ``OFFSET``, so every page costs the same.
+    """
+
+    cursor_query_param = "cursor"
+    cursor_paginator_class = LimitCursorPaginator
+
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.wants_cursor(request):
+            self.cursor_paginator = None
+            return super().paginate_queryset(queryset, request, view)
+
+        self.cursor_paginator = self.cursor_paginator_class()
+        if view is not None and hasattr(view, "cursor_ordering"):
+            self.cursor_paginator.ordering = view.cursor_ordering
+        page = self.cursor_paginator.paginate_queryset(queryset, request, view)
+        self.display_page_controls = (
+            self.cursor_paginator.display_page_controls
+        )
+        return page
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.to_html()
+        return super().to_html()
+
+    def wants_cursor(self, request):
+        return (
+            self.cursor_query_param in request.query_params
+            or request.query_params.get("pagination") == "cursor"
+        )
@@ -0,0 +1,111 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.functional import SimpleLazyObject
+
+PINNED_KEY = "db:primary:{}"
+
+_state = threading.local()
+
+
+def route_reads_to_replicas(request):
+    """Let reads made while handling ``request`` go to a replica."""
+    _state.request = request
+
+
+def stop_routing():
+    _state.request = None
+
+
+@contextmanager
+def read_from_primary():
+    """Send the reads made inside the block to the primary.
+
+    Anything rendered into a cache shared by all users is read here: a
+    lagging replica would store old data under a version stamp that is
+    already current.
+    """
+    _state.primary = getattr(_state, "primary", 0) + 1
+    try:
+        yield
+    finally:
+        _state.primary -= 1
+
+
+def reads_from_replica():
+    """Tell whether reads made now would go to a replica."""
+    request = getattr(_state, "request", None)
+    return not (
+        request is None
+        or not settings.DATABASE_REPLICAS
+        or getattr(_state, "primary", 0)
+        or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        or is_pinned(request)
+    )
+
+
+def replica_may_lag(since):
+    """Tell whether reads made now may miss changes made at ``since``.
+
+    Replicas are assumed to catch up within ``READ_YOUR_WRITES_WINDOW``
+    seconds, the same window the writer is pinned to the primary for.
+    """
+    return (
+        reads_from_replica()
+        and time.time() - since < settings.READ_YOUR_WRITES_WINDOW
+    )
+
+
+def pin_to_primary(user):
+    """Keep the user's reads on the primary while replicas catch up."""
+    cache.set(
+        PINNED_KEY.format(user.pk),
+        True,
+        timeout=settings.READ_YOUR_WRITES_WINDOW,
+    )
+
+
+def is_pinned(request):
+    """Tell whether the request's user must read from the primary.
+
+    Until DRF authenticates the request, ``request.user`` is the lazy
+    object of ``AuthenticationMiddleware``; resolving it here would load
+    the session through this router again. Reads made before the user is
+    known, such as the authentication lookups, stay on the primary.
+    """
+    user = getattr(request, "user", None)
+    if isinstance(user, SimpleLazyObject):
+        return True
+    if user is None or not user.is_authenticated:
+        return False
+
+    if getattr(request, "_pinned_to_primary", None) is None:
+        request._pinned_to_primary = bool(
+            cache.get(PINNED_KEY.format(user.pk))
+        )
+    return request._pinned_to_primary
+
+
+class ReplicaRouter:
+    """Send reads of routed requests to a random replica.
+
+    Everything else, including reads inside a transaction, reads inside
+    ``read_from_primary`` and reads of users who wrote something within
+    ``READ_YOUR_WRITES_WINDOW`` seconds, stays on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not reads_from_replica():
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -1,7 +1,10 @@
+import datetime as dt
 import os
+import tempfile
 from pathlib import Path
 
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 
 env = environ.Env()
@@ -41,6 +44,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "main.middleware.ServerTimingMiddleware",
+    "main.middleware.MetricsMiddleware",
+    "main.middleware.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -49,8 +55,61 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "main.middleware.ReplicaRoutingMiddleware",
 ]
 
+SERVER_TIMING_ENABLED = env.bool("SERVER_TIMING_ENABLED", default=False)
+METRICS_ENABLED = env.bool("METRICS_ENABLED", default=False)
+
+# Statements slower than SLOW_QUERY_THRESHOLD seconds are sampled with
+# SLOW_QUERY_SAMPLE_RATE and logged with their plans to a rotating file
+# per worker, named after SLOW_QUERY_LOG_FILE with the process id.
+SLOW_QUERY_LOG_ENABLED = env.bool("SLOW_QUERY_LOG_ENABLED", default=False)
+SLOW_QUERY_THRESHOLD = env.float("SLOW_QUERY_THRESHOLD", default=0.2)
+SLOW_QUERY_SAMPLE_RATE = env.float("SLOW_QUERY_SAMPLE_RATE", default=1.0)
+SLOW_QUERY_LOG_FILE = env.str(
+    "SLOW_QUERY_LOG_FILE",
+    default=os.path.join(tempfile.gettempdir(), "foodgram-slow-queries.log"),
+)
+SLOW_QUERY_LOG_MAX_BYTES = env.int(
+    "SLOW_QUERY_LOG_MAX_BYTES", default=10 * 1024 * 1024
+)
+SLOW_QUERY_LOG_BACKUP_COUNT = env.int("SLOW_QUERY_LOG_BACKUP_COUNT", default=5)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "access": {
+            "class": "logging.StreamHandler",
+            "formatter": "message",
+        },
+        "slow_queries": {
+            "class": "main.log_files.WorkerFileHandler",
+            "formatter": "message",
+            "filename": SLOW_QUERY_LOG_FILE,
+            "maxBytes": SLOW_QUERY_LOG_MAX_BYTES,
+            "backupCount": SLOW_QUERY_LOG_BACKUP_COUNT,
+            "delay": True,
+        },
+    },
+    "loggers": {
+        "main.access": {
+            "handlers": ["access"],
+            "level": "INFO",
+            "propagate": False,
+        },
+        "main.slow_queries": {
+            "handlers": ["slow_queries"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 ROOT_URLCONF = "main.urls"
 
 TEMPLATES = [
@@ -73,7 +132,7 @@ WSGI_APPLICATION = "main.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "ENGINE": "main.db",
         "NAME": env.str("POSTGRES_DB"),
         "USER": env.str("POSTGRES_USER"),
         "PASSWORD": env.str("POSTGRES_PASSWORD"),
@@ -82,6 +141,86 @@ DATABASES = {
     }
 }
 
+# Without the pool every thread keeps its connection for DB_CONN_MAX_AGE
+# seconds. With the pool Django hands connections back after each request
+# and the pool recycles them after DB_CONN_MAX_AGE seconds instead. The
+# pool of one worker is capped by its share of Postgres max_connections
+# left after the reserve for migrations, cron jobs and psql sessions.
+DB_CONN_MAX_AGE = env.int("DB_CONN_MAX_AGE", default=60)
+DB_HEALTH_CHECKS = env.bool("DB_HEALTH_CHECKS", default=True)
+DB_POOL_ENABLED = env.bool("DB_POOL_ENABLED", default=False)
+DB_POOL_TIMEOUT = env.float("DB_POOL_TIMEOUT", default=5.0)
+DB_POOL_SLOW_WAIT = env.float("DB_POOL_SLOW_WAIT", default=0.1)
+POSTGRES_MAX_CONNECTIONS = env.int("POSTGRES_MAX_CONNECTIONS", default=100)
+DB_RESERVED_CONNECTIONS = env.int("DB_RESERVED_CONNECTIONS", default=10)
+DB_WORKERS_TOTAL = env.int(
+    "DB_WORKERS_TOTAL", default=env.int("WEB_CONCURRENCY", default=1)
+)
+DB_POOL_MAX_SIZE = env.int(
+    "DB_POOL_MAX_SIZE",
+    default=max(
+        1,
+        (POSTGRES_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS)
+        // DB_WORKERS_TOTAL,
+    ),
+)
+DATABASES["default"]["CONN_MAX_AGE"] = (
+    0 if DB_POOL_ENABLED else DB_CONN_MAX_AGE
+)
+
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+    env.list("POSTGRES_REPLICA_HOSTS", default=[]), start=1
+):
+    host, _, port = address.partition(":")
+    alias = f"replica_{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["main.routers.ReplicaRouter"]
+READ_YOUR_WRITES_WINDOW = env.int("READ_YOUR_WRITES_WINDOW", default=5)
+
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+# Recipe cards, shared pages, ETag versions, read-your-writes pins and the
+# cache counters have to be seen by every worker of every backend, so a
+# per-process cache is only good enough for the development server.
+if not DEBUG and CACHES["default"]["BACKEND"].endswith(".LocMemCache"):
+    raise ImproperlyConfigured(
+        "CACHE_URL must point to a cache shared by all workers, "
+        "e.g. rediscache://redis:6379/1"
+    )
+
+TEST_RUNNER = "main.test_runner.TestRunner"
+
+RECIPE_CACHE_TIMEOUT = env.int("RECIPE_CACHE_TIMEOUT", default=60 * 60)
+RECIPE_PAGE_CACHE_TIMEOUT = env.int(
+    "RECIPE_PAGE_CACHE_TIMEOUT", default=5 * 60
+)
+RECIPE_USER_FLAGS_TIMEOUT = env.int(
+    "RECIPE_USER_FLAGS_TIMEOUT", default=5 * 60
+)
+
+INGREDIENT_AUTOCOMPLETE_ENABLED = env.bool(
+    "INGREDIENT_AUTOCOMPLETE_ENABLED", default=True
+)
+INGREDIENT_AUTOCOMPLETE_LIMIT = env.int(
+    "INGREDIENT_AUTOCOMPLETE_LIMIT", default=20
+)
+INGREDIENT_AUTOCOMPLETE_MAX_LIMIT = 100
+INGREDIENT_INDEX_TTL = env.int("INGREDIENT_INDEX_TTL", default=15 * 60)
+
+FEED_TIMELINE_SIZE = env.int("FEED_TIMELINE_SIZE", default=1000)
+FEED_FANOUT_BATCH_SIZE = env.int("FEED_FANOUT_BATCH_SIZE", default=1000)
+FEED_FANOUT_MAX_FOLLOWERS = env.int("FEED_FANOUT_MAX_FOLLOWERS", default=10000)
+FEED_FANOUT_ASYNC = env.bool("FEED_FANOUT_ASYNC", default=True)
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -110,6 +249,14 @@ EMPTY_VALUE = "-None-"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+RECIPE_IMAGE_VARIANTS_ASYNC = env.bool(
+    "RECIPE_IMAGE_VARIANTS_ASYNC", default=True
+)
+RECIPE_IMAGE_WORKERS = env.int("RECIPE_IMAGE_WORKERS", default=1)
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = env.int(
+    "RECIPE_IMAGE_MAX_UPLOAD_SIZE", default=10 * 1024 * 1024
+)
+
 STATIC_URL = "/static/"
 if DEBUG:
     STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
@@ -124,7 +271,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.AllowAny",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "users.authentication.RoleTokenAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 5,
@@ -133,6 +280,22 @@ REST_FRAMEWORK = {
     ],
 }
 
+AUTH_JWT_ENABLED = env.bool("AUTH_JWT_ENABLED", default=False)
+if AUTH_JWT_ENABLED:
+    REST_FRAMEWORK["DEFAULT_AUTHENTICATION_CLASSES"].insert(
+        0, "users.authentication.RoleJWTAuthentication"
+    )
+
+SIMPLE_JWT = {
+    "ACCESS_TOKEN_LIFETIME": dt.timedelta(
+        minutes=env.int("JWT_ACCESS_TOKEN_MINUTES", default=5)
+    ),
+    "REFRESH_TOKEN_LIFETIME": dt.timedelta(
+        days=env.int("JWT_REFRESH_TOKEN_DAYS", default=1)
+    ),
+    "AUTH_HEADER_TYPES": ("Bearer",),
+}
+
 DJOSER = {
     "LOGIN_FIELD": "email",
     "SERIALIZERS": {
@@ -0,0 +1,172 @@
+"""Capture of slow SQL statements with their query plans.
+
+With ``SLOW_QUERY_LOG_ENABLED`` every connection of the ``main.db``
+backend runs its statements through ``record``. A statement that takes
+``SLOW_QUERY_THRESHOLD`` seconds or more is sampled with probability
+``SLOW_QUERY_SAMPLE_RATE``, explained with ``EXPLAIN`` (the plan only, the
+statement is not run again) and written as one JSON line to the
+``main.slow_queries`` log, a file per worker, together with the view
+action and the innermost project frame that issued it. Parameters are
+used for the plan but never logged.
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import timing
+from .log_files import log_files
+
+logger = logging.getLogger("main.slow_queries")
+
+_state = threading.local()
+
+SKIPPED_PATHS = (
+    os.path.join("main", "middleware.py"),
+    os.path.join("main", "slow_queries.py"),
+    os.path.join("main", "timing.py"),
+    os.path.join("main", "db", ""),
+)
+EXPLAIN_SAVEPOINT = "slow_query_explain"
+EXPLAINABLE_RE = re.compile(
+    r"^\s*(?:SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE
+)
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+LIST_RE = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+SPACE_RE = re.compile(r"\s+")
+
+
+def record(execute, sql, params, many, context):
+    """Execute wrapper that logs the statement if it was slow."""
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration = time.perf_counter() - started
+    if (
+        duration >= settings.SLOW_QUERY_THRESHOLD
+        and random.random() < settings.SLOW_QUERY_SAMPLE_RATE
+    ):
+        connection = context["connection"]
+        plan = None if many else explain(connection, sql, params)
+        logger.warning(
+            json.dumps(
+                {
+                    "time": timezone.now().isoformat(),
+                    "alias": connection.alias,
+                    "action": current_action(),
+                    "duration_ms": round(duration * 1000, 1),
+                    "shape": normalize(sql),
+                    "sql": sql,
+                    "frame": origin(),
+                    "plan": plan,
+                },
+                ensure_ascii=False,
+            )
+        )
+    return result
+
+
+def set_action(action):
+    _state.action = action
+
+
+def current_action():
+    """Return the view action of the request handled by this thread."""
+    current = timing.current()
+    if current is not None and current.action:
+        return current.action
+    return getattr(_state, "action", None)
+
+
+def normalize(sql):
+    """Reduce a statement to its shape: no literals, lists of any size."""
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    sql = LIST_RE.sub("(...)", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+def origin():
+    """Return the innermost project frame as ``path:line in function``."""
+    base_dir = os.path.join(settings.BASE_DIR, "")
+    for frame in reversed(traceback.extract_stack()):
+        if not frame.filename.startswith(base_dir):
+            continue
+        path = os.path.relpath(frame.filename, settings.BASE_DIR)
+        if not path.startswith(SKIPPED_PATHS):
+            return f"{path}:{frame.lineno} in {frame.name}"
+    return None
+
+
+def explain(connection, sql, params):
+    """Return the plan of ``sql`` as a list of lines.
+
+    The raw cursor keeps ``EXPLAIN`` away from the execute wrappers, and
+    inside a transaction a savepoint keeps a failed ``EXPLAIN`` from
+    aborting it.
+    """
+    if not EXPLAINABLE_RE.match(sql):
+        return None
+
+    savepoint = not connection.get_autocommit()
+    with connection.connection.cursor() as cursor:
+        if savepoint:
+            cursor.execute(f"SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        try:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            plan = [row[0] for row in cursor.fetchall()]
+        except connection.Database.Error as error:
+            plan = [f"EXPLAIN failed: {str(error).splitlines()[0]}"]
+            if savepoint:
+                cursor.execute(f"ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}")
+        if savepoint:
+            cursor.execute(f"RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}")
+    return plan
+
+
+def read_entries(path):
+    """Yield the entries of the logs of all workers and of their backups."""
+    for name in log_files(path):
+        with open(name) as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries):
+    """Group entries by query shape, the slowest in total first."""
+    shapes = {}
+    for entry in entries:
+        summary = shapes.setdefault(
+            entry["shape"],
+            {
+                "shape": entry["shape"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "actions": Counter(),
+                "frames": Counter(),
+                "slowest": None,
+            },
+        )
+        summary["count"] += 1
+        summary["total_ms"] += entry["duration_ms"]
+        summary["actions"][entry["action"]] += 1
+        summary["frames"][entry["frame"]] += 1
+        if entry["duration_ms"] >= summary["max_ms"]:
+            summary["max_ms"] = entry["duration_ms"]
+            summary["slowest"] = entry
+    return sorted(
+        shapes.values(), key=lambda summary: summary["total_ms"], reverse=True
+    )
@@ -0,0 +1,37 @@
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+}
+
+
+class TestRunner(DiscoverRunner):
+    """Test runner that keeps the tests off the shared cache.
+
+    Tests clear the cache between requests. With ``CACHE_URL`` pointing at
+    the Redis of a running site, that would drop its version stamps,
+    read-your-writes pins and cached pages, so every test run gets a
+    process-local cache instead. Uploaded files and image variants go to
+    a temporary ``MEDIA_ROOT`` removed after the run. Reads are not routed
+    to replicas: the test databases of replica aliases mirror the primary
+    through separate connections, which do not see uncommitted test data.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.media_root = tempfile.mkdtemp(prefix="foodgram-test-media-")
+        self.test_settings = override_settings(
+            CACHES=TEST_CACHES,
+            DATABASE_REPLICAS=[],
+            MEDIA_ROOT=self.media_root,
+        )
+        self.test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.test_settings.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
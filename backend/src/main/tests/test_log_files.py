@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from main import slow_queries
+from main.log_files import WorkerFileHandler, log_files, worker_path
+
+
+class WorkerFileHandlerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.path = os.path.join(directory, "slow.log")
+
+    def make_handler(self, **kwargs):
+        handler = WorkerFileHandler(self.path, **kwargs)
+        self.addCleanup(handler.close)
+        return handler
+
+    def log(self, handler, message):
+        handler.emit(
+            logging.LogRecord(
+                "main.slow_queries", logging.WARNING, "", 0, message, (), None
+            )
+        )
+
+    def test_writes_file_of_current_process(self):
+        handler = self.make_handler()
+
+        self.log(handler, "{}")
+
+        self.assertEqual(log_files(self.path), [worker_path(self.path)])
+
+    def test_reopens_after_fork(self):
+        handler = self.make_handler()
+        self.log(handler, "{}")
+        handler.pid = -1  # As seen from a forked worker.
+
+        self.log(handler, "{}")
+
+        self.assertEqual(handler.pid, os.getpid())
+        self.assertEqual(handler.baseFilename, worker_path(self.path))
+
+    def test_rotates_per_worker(self):
+        handler = self.make_handler(maxBytes=10, backupCount=2)
+
+        for _ in range(3):
+            self.log(handler, "0123456789")
+
+        current = worker_path(self.path)
+        self.assertEqual(
+            log_files(self.path), [current, f"{current}.1", f"{current}.2"]
+        )
+
+    def test_reads_entries_of_all_workers(self):
+        other = worker_path(self.path, 1)
+        for name in (self.path, other, f"{other}.1", f"{self.path}.tmp"):
+            with open(name, "w") as file:
+                file.write(json.dumps({"file": name}) + "\n")
+
+        entries = slow_queries.read_entries(self.path)
+
+        self.assertCountEqual(
+            [entry["file"] for entry in entries],
+            [self.path, other, f"{other}.1"],
+        )
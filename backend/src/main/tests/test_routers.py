@@ -0,0 +1,79 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.functional import SimpleLazyObject
+
+from main.routers import (
+    PINNED_KEY,
+    ReplicaRouter,
+    pin_to_primary,
+    read_from_primary,
+    replica_may_lag,
+    route_reads_to_replicas,
+    stop_routing,
+)
+
+User = get_user_model()
+
+REPLICA = "replica"
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.request = RequestFactory().get("/api/recipes/")
+        route_reads_to_replicas(self.request)
+        self.addCleanup(stop_routing)
+
+    def test_lazy_user_is_not_resolved(self):
+        def load_user():
+            # The session and the token are loaded through the router.
+            self.router.db_for_read(User)
+            return AnonymousUser()
+
+        self.request.user = SimpleLazyObject(load_user)
+
+        self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_anonymous_user_reads_replica(self):
+        self.request.user = AnonymousUser()
+
+        self.assertEqual(self.router.db_for_read(User), REPLICA)
+
+    def test_pinned_user_reads_primary(self):
+        user = User(pk=-1)
+        self.addCleanup(cache.delete, PINNED_KEY.format(user.pk))
+        self.request.user = user
+        self.assertEqual(self.router.db_for_read(User), REPLICA)
+
+        pin_to_primary(user)
+        del self.request._pinned_to_primary
+
+        self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+
+    def test_read_from_primary_overrides_routing(self):
+        self.request.user = AnonymousUser()
+
+        with read_from_primary():
+            with read_from_primary():
+                self.assertEqual(
+                    self.router.db_for_read(User), DEFAULT_DB_ALIAS
+                )
+            self.assertEqual(self.router.db_for_read(User), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(User), REPLICA)
+
+    def test_replica_may_lag_within_window(self):
+        self.request.user = AnonymousUser()
+        window = settings.READ_YOUR_WRITES_WINDOW
+
+        self.assertTrue(replica_may_lag(time.time() - window / 2))
+        self.assertFalse(replica_may_lag(time.time() - window * 2))
+
+        stop_routing()
+        self.assertFalse(replica_may_lag(time.time()))
@@ -0,0 +1,8 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+
+class TestRunnerTests(SimpleTestCase):
+    def test_tests_use_local_cache(self):
+        self.assertIsInstance(caches["default"], LocMemCache)
@@ -0,0 +1,133 @@
+"""Per-request timing of database, serializer and render work.
+
+``track()`` hooks every database connection of the thread with an execute
+wrapper for the duration of a request, so each query adds to the running
+totals of the current ``RequestTiming``. Serializer time is collected by
+``instrument_serializers()``, which wraps the ``data`` property of DRF
+serializers once, when timing is turned on.
+"""
+
+import json
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from rest_framework import serializers
+
+_state = threading.local()
+_instrument_lock = threading.Lock()
+
+
+class RequestTiming:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.action = None
+        self.db = 0.0
+        self.queries = 0
+        self.serialize = 0.0
+        self.render = 0.0
+        self.total = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def header(self):
+        """Return the ``Server-Timing`` header value, durations in ms."""
+        return ", ".join(
+            (
+                f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+                f"serialize;dur={self.serialize * 1000:.1f}",
+                f"render;dur={self.render * 1000:.1f}",
+                f"total;dur={self.total * 1000:.1f}",
+            )
+        )
+
+    def log_line(self, request, response):
+        user = getattr(request, "user", None)
+        return json.dumps(
+            {
+                "action": self.action,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "user": user.pk if user is not None else None,
+                "total_ms": round(self.total * 1000, 1),
+                "db_ms": round(self.db * 1000, 1),
+                "queries": self.queries,
+                "serialize_ms": round(self.serialize * 1000, 1),
+                "render_ms": round(self.render * 1000, 1),
+            },
+            ensure_ascii=False,
+        )
+
+
+def current():
+    """Return the timing of the request handled by this thread, if any."""
+    return getattr(_state, "timing", None)
+
+
+@contextmanager
+def track():
+    timing = RequestTiming()
+    _state.timing = timing
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timing))
+            yield timing
+    finally:
+        _state.timing = None
+        timing.finish()
+
+
+def action_name(request, view_func):
+    """Name a view like ``RecipesViewSet.list`` or ``APIFollowView.post``."""
+    view_class = getattr(view_func, "cls", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{view_func.__name__}"
+
+    method = request.method.lower()
+    actions = getattr(view_func, "actions", None)
+    if actions is not None:
+        method = actions.get(method, method)
+    return f"{view_class.__name__}.{method}"
+
+
+def instrument_serializers():
+    """Add the time spent in ``serializer.data`` to the current request."""
+    with _instrument_lock:
+        for serializer_class in (
+            serializers.Serializer,
+            serializers.ListSerializer,
+        ):
+            data = serializer_class.data
+            if not getattr(data.fget, "timed", False):
+                serializer_class.data = property(_timed(data.fget))
+
+
+def _timed(get_data):
+    def data(serializer):
+        timing = current()
+        if timing is None or timing.serializing:
+            return get_data(serializer)
+
+        timing.serializing = True
+        started = time.perf_counter()
+        try:
+            return get_data(serializer)
+        finally:
+            timing.serialize += time.perf_counter() - started
+            timing.serializing = False
+
+    data.timed = True
+    return data
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
+from . import views
+
 api_patterns = [
     path("", include("users.urls", namespace="api_users")),
     path("", include("recipes.urls", namespace="api_recipes")),
@@ -10,3 +13,6 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include(api_patterns)),
 ]
+
+if settings.METRICS_ENABLED:
+    urlpatterns.append(path("metrics", views.metrics, name="metrics"))
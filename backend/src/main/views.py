@@ -0,0 +1,8 @@
+from django.http import HttpResponse
+
+from . import metrics as prometheus
+
+
+def metrics(request):
+    body, content_type = prometheus.export()
+    return HttpResponse(body, content_type=content_type)
@@ -42,9 +42,10 @@ class IngredientAdmin(admin.ModelAdmin):
     empty_value_display = settings.EMPTY_VALUE
 
     def get_recipes_count(self, obj):
-        return RecipeIngredient.objects.filter(ingredient=obj.id).count()
+        return obj.recipes_count
 
     get_recipes_count.short_description = "Использований в рецептах"
+    get_recipes_count.admin_order_field = "recipes_count"
 
 
 @admin.register(RecipeIngredient)
@@ -66,19 +67,21 @@ class RecipeAdmin(admin.ModelAdmin):
         "name",
         "author",
         "in_favorite",
+        "carts_count",
     )
     list_filter = (
         "name",
         "author",
         "tags",
     )
-    readonly_fields = ("in_favorite",)
+    readonly_fields = ("in_favorite", "carts_count")
     empty_value_display = settings.EMPTY_VALUE
 
     def in_favorite(self, obj):
-        return obj.in_favorite.all().count()
+        return obj.favorites_count
 
     in_favorite.short_description = "Количество добавлений в избранное"
+    in_favorite.admin_order_field = "favorites_count"
 
 
 @admin.register(FavoriteRecipe)
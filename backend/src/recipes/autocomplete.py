@@ -0,0 +1,174 @@
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Ingredient
+
+INDEX_VERSION_KEY = "recipes:ingredients:index-version"
+FUZZY_SIMILARITY = 0.3
+
+
+class IngredientIndex:
+    """Read-only autocomplete index over ingredient names.
+
+    Entries are kept in parallel arrays sorted by lowercased name, so prefix
+    lookups are a binary search. Each trigram maps to an ``array`` of entry
+    positions, which serves substring and fuzzy lookups. Results are ranked
+    prefix matches first, then substring matches, then names sharing enough
+    trigrams with the query.
+    """
+
+    def __init__(self, rows):
+        entries = sorted(
+            (name.lower(), pk, name, unit) for pk, name, unit in rows
+        )
+        self._keys = [key for key, _, _, _ in entries]
+        self._ids = array("l", (pk for _, pk, _, _ in entries))
+        self._names = [name for _, _, name, _ in entries]
+        self._units = [unit for _, _, _, unit in entries]
+        self._trigram_counts = array("H")
+
+        postings = defaultdict(list)
+        for position, key in enumerate(self._keys):
+            trigrams = _trigrams(key)
+            self._trigram_counts.append(min(len(trigrams), 0xFFFF))
+            for trigram in trigrams:
+                postings[trigram].append(position)
+        self._postings = {
+            trigram: array("L", positions)
+            for trigram, positions in postings.items()
+        }
+
+    def __len__(self):
+        return len(self._keys)
+
+    def search(self, query, limit):
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+
+        positions = self._prefix(query, limit)
+        if len(positions) < limit and len(query) >= 3:
+            positions += self._by_trigrams(
+                query, limit - len(positions), exclude=set(positions)
+            )
+        return [self._row(position) for position in positions]
+
+    def _prefix(self, query, limit):
+        positions = []
+        start = bisect_left(self._keys, query)
+        for position in range(start, len(self._keys)):
+            if len(positions) >= limit:
+                break
+            if not self._keys[position].startswith(query):
+                break
+            positions.append(position)
+        return positions
+
+    def _by_trigrams(self, query, limit, exclude):
+        trigrams = _trigrams(query)
+        postings = sorted(
+            (self._postings.get(trigram, ()) for trigram in trigrams), key=len
+        )
+        candidates = set(postings[0]).intersection(*postings[1:])
+        substring = self._rank_substring(query, candidates, exclude, limit)
+        if len(substring) >= limit:
+            return substring
+
+        shared = Counter()
+        for positions in postings:
+            shared.update(positions)
+        exclude = exclude.union(substring)
+        return substring + self._rank_fuzzy(
+            len(trigrams), shared, exclude, limit - len(substring)
+        )
+
+    def _rank_substring(self, query, candidates, exclude, limit):
+        scored = []
+        for position in candidates:
+            if position in exclude:
+                continue
+            offset = self._keys[position].find(query)
+            if offset >= 0:
+                key_length = len(self._keys[position])
+                scored.append((offset, key_length, position))
+        return [position for _, _, position in heapq.nsmallest(limit, scored)]
+
+    def _rank_fuzzy(self, query_trigrams, shared, exclude, limit):
+        scored = []
+        for position, common in shared.items():
+            if position in exclude:
+                continue
+            union = query_trigrams + self._trigram_counts[position] - common
+            similarity = common / union
+            if similarity >= FUZZY_SIMILARITY:
+                scored.append(
+                    (-similarity, len(self._keys[position]), position)
+                )
+        return [position for _, _, position in heapq.nsmallest(limit, scored)]
+
+    def _row(self, position):
+        return {
+            "id": self._ids[position],
+            "name": self._names[position],
+            "unit": self._units[position],
+        }
+
+
+_index = None
+_index_version = None
+_index_built_at = 0.0
+_lock = threading.Lock()
+
+
+def get_ingredient_index():
+    """Return the process-wide index, rebuilding it when it went stale.
+
+    The index is rebuilt when another process bumped the version in the
+    shared cache or after ``INGREDIENT_INDEX_TTL`` seconds, whichever comes
+    first.
+    """
+    global _index, _index_version, _index_built_at
+
+    version = cache.get(INDEX_VERSION_KEY, 0)
+    expired = (
+        time.monotonic() - _index_built_at > settings.INGREDIENT_INDEX_TTL
+    )
+    if _index is not None and version == _index_version and not expired:
+        return _index
+
+    with _lock:
+        if _index is None or version != _index_version or expired:
+            rows = Ingredient.objects.values_list("id", "name", "unit")
+            _index = IngredientIndex(rows.iterator())
+            _index_version = version
+            _index_built_at = time.monotonic()
+    return _index
+
+
+def reset_index():
+    """Drop the index of this process, e.g. between tests."""
+    global _index, _index_version, _index_built_at
+
+    with _lock:
+        _index = None
+        _index_version = None
+        _index_built_at = 0.0
+
+
+def invalidate_ingredient_index():
+    cache.add(INDEX_VERSION_KEY, 0, timeout=None)
+    try:
+        cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_KEY, 1, timeout=None)
+
+
+def _trigrams(text):
+    return {"".join(chars) for chars in zip(text, text[1:], text[2:])}
@@ -0,0 +1,418 @@
+"""Latency and query-count benchmarks of the API on synthetic datasets.
+
+``seed`` grows the current database to the requested number of recipes
+with matching users, favorites, carts and follows, generated in bulk by
+``recipes.seeding``. ``run`` requests every endpoint in ``ENDPOINTS``
+through the test client, then replaces all ingredients of a recipe of the
+benchmark user for every count in ``INGREDIENT_UPDATES``, and returns
+plain dicts, so the results of two commits can be compared as JSON.
+"""
+
+import itertools
+import json
+import math
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from rest_framework.authtoken.models import Token
+
+from users.models import AuthorStats, Follow
+
+from . import seeding
+from .models import Busket, FavoriteRecipe, Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+RECIPES_PER_USER = 10
+FAVORITES_PER_USER = 20
+CARTS_PER_USER = 5
+FOLLOWS_PER_USER = 10
+BATCH_SIZE = 10000
+
+BENCHMARK_USERNAME = "benchmark"
+BENCHMARK_FAVORITES = 50
+BENCHMARK_CARTS = 10
+BENCHMARK_FOLLOWS = 20
+BENCHMARK_RECIPE_NAME = "Рецепт бенчмарка"
+SEARCH_WORD = "курица"
+INGREDIENT_PREFIX = "мол"
+# Keys of the benchmark in the default cache, which may be the Redis of a
+# running site.
+CACHE_KEY_PREFIX = "benchmark"
+
+
+# (name, path, authenticated); paths are formatted with ``path_context``
+ENDPOINTS = (
+    ("recipes_list", "/api/recipes/", False),
+    ("recipes_list_authenticated", "/api/recipes/", True),
+    ("recipes_list_page_10", "/api/recipes/?page=10", True),
+    ("recipes_list_cursor", "/api/recipes/?pagination=cursor", True),
+    ("recipes_list_tags", "/api/recipes/?tags={tag}&tags={other_tag}", True),
+    ("recipes_list_author", "/api/recipes/?author={author_id}", True),
+    ("recipes_list_favorited", "/api/recipes/?is_favorited=1", True),
+    ("recipes_list_not_favorited", "/api/recipes/?is_favorited=0", True),
+    ("recipes_list_in_cart", "/api/recipes/?is_in_shopping_cart=1", True),
+    ("recipes_list_search", "/api/recipes/?search={word}", True),
+    ("recipe_detail", "/api/recipes/{recipe_id}/", True),
+    ("recipe_detail_anonymous", "/api/recipes/{recipe_id}/", False),
+    ("recipes_feed", "/api/recipes/feed/", True),
+    ("subscriptions", "/api/users/subscriptions/?recipes_limit=3", True),
+    ("shopping_cart_download", "/api/recipes/download_shopping_cart/", True),
+    ("ingredient_search", "/api/ingredients/?name={prefix}", False),
+    ("tags", "/api/tags/", False),
+    ("users_me", "/api/users/me/", True),
+)
+
+# Numbers of ingredients replaced by one ``PATCH`` of a recipe; the time and
+# the query count should not grow with them.
+INGREDIENT_UPDATES = (5, 20, 50)
+
+
+@contextmanager
+def test_database(keepdb=False, verbosity=1):
+    """Run the block against the test database, with replicas turned off.
+
+    The default cache gets the benchmark's key prefix, so ``clear_cache``
+    can empty it without touching the keys of the site.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=verbosity,
+        autoclobber=True,
+        serialize=False,
+        keepdb=keepdb,
+    )
+    try:
+        with override_settings(
+            DATABASE_REPLICAS=[], CACHES=_benchmark_caches()
+        ):
+            yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=verbosity, keepdb=keepdb
+        )
+        teardown_test_environment()
+
+
+def clear_cache():
+    """Delete the benchmark's keys from the default cache.
+
+    On Redis only the keys under ``CACHE_KEY_PREFIX`` are deleted; a local
+    memory cache belongs to this process and is emptied.
+    """
+    if hasattr(cache, "delete_pattern"):
+        cache.delete_pattern("*")
+    else:
+        cache.clear()
+
+
+def seed(recipes, seed=0, workers=1):
+    """Grow the database to ``recipes`` recipes, return what was added.
+
+    Every call with the same arguments on the same data adds the same rows,
+    so datasets of increasing size can be built one on top of the other.
+    """
+    added = recipes - Recipe.objects.count()
+    if added <= 0:
+        return {}
+
+    counts, user_ids = seeding.add(
+        max(1, added // RECIPES_PER_USER),
+        added,
+        favorites=FAVORITES_PER_USER,
+        carts=CARTS_PER_USER,
+        follows=FOLLOWS_PER_USER,
+        seed=seed,
+        workers=workers,
+    )
+
+    rng = random.Random(f"{seed}:{recipes}")
+    with transaction.atomic():
+        user = get_benchmark_user()
+        _reset_benchmark_user(
+            user,
+            list(Recipe.objects.order_by("pk").values_list("pk", flat=True)),
+            list(User.objects.order_by("pk").values_list("pk", flat=True)),
+            rng,
+        )
+
+    seeding.refresh([*user_ids, user.pk])
+    return counts
+
+
+def get_benchmark_user():
+    user, created = User.objects.get_or_create(
+        username=BENCHMARK_USERNAME,
+        defaults={"email": f"{BENCHMARK_USERNAME}@example.com"},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=["password"])
+    return user
+
+
+def path_context(user):
+    tags = list(Tag.objects.order_by("pk").values_list("slug", flat=True))
+    author_id = (
+        AuthorStats.objects.order_by("-recipes_count", "pk")
+        .values_list("user_id", flat=True)
+        .first()
+    )
+    return {
+        "tag": tags[0],
+        "other_tag": tags[-1],
+        "author_id": author_id,
+        "recipe_id": Recipe.objects.order_by("pk").first().pk,
+        "word": SEARCH_WORD,
+        "prefix": INGREDIENT_PREFIX,
+    }
+
+
+def get_benchmark_recipe(user):
+    """Return a recipe of the benchmark user, reusing a seeded image."""
+    recipe = Recipe.objects.filter(
+        author=user, name=BENCHMARK_RECIPE_NAME
+    ).first()
+    if recipe is not None:
+        return recipe
+
+    template = Recipe.objects.exclude(author=user).order_by("pk").first()
+    return Recipe.objects.create(
+        author=user,
+        name=BENCHMARK_RECIPE_NAME,
+        text=template.text,
+        cooking_time=template.cooking_time,
+        image=template.image.name,
+        image_variants_source=template.image_variants_source,
+        image_placeholder=template.image_placeholder,
+    )
+
+
+def run(repeat):
+    """Request every endpoint ``repeat`` times, return timings by name."""
+    user = get_benchmark_user()
+    token, _ = Token.objects.get_or_create(user=user)
+    context = path_context(user)
+    client = Client()
+    auth = {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+    results = {}
+    for name, path, authenticated in ENDPOINTS:
+        path = path.format(**context)
+        headers = auth if authenticated else {}
+        results[name] = measure(path, _getter(client, path, headers), repeat)
+
+    recipe = get_benchmark_recipe(user)
+    for amount in INGREDIENT_UPDATES:
+        path = f"/api/recipes/{recipe.pk}/"
+        results[f"recipe_update_ingredients_{amount}"] = measure(
+            path, _ingredient_updater(client, path, auth, amount), repeat
+        )
+    return results
+
+
+def measure(path, send, repeat):
+    """Time one cold request after a cache flush and ``repeat`` warm ones.
+
+    ``send`` makes the request. Query counts come from separate requests,
+    so recording the queries does not slow down the timed ones.
+    """
+    clear_cache()
+    cold_ms = _request(send)
+    clear_cache()
+    cold_queries, status = _count_queries(send)
+
+    timings = sorted(_request(send) for _ in range(repeat))
+    queries, _ = _count_queries(send)
+    return {
+        "path": path,
+        "status": status,
+        "queries": queries,
+        "cold_queries": cold_queries,
+        "cold_ms": round(cold_ms, 3),
+        "min_ms": round(timings[0], 3),
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[math.ceil(len(timings) * 0.95) - 1], 3),
+        "max_ms": round(timings[-1], 3),
+        "mean_ms": round(statistics.mean(timings), 3),
+    }
+
+
+def compare(baseline, current, threshold):
+    """Return ``(size, endpoint, metric, before, after)`` regressions.
+
+    Latency regresses when the median grew by more than ``threshold``
+    times, the query count when it grew at all.
+    """
+    before = {
+        (dataset["recipes"], name): result
+        for dataset in baseline["datasets"]
+        for name, result in dataset["results"].items()
+    }
+    regressions = []
+    for dataset in current["datasets"]:
+        for name, result in dataset["results"].items():
+            old = before.get((dataset["recipes"], name))
+            if old is None:
+                continue
+            if result["queries"] > old["queries"]:
+                regressions.append(
+                    (
+                        dataset["recipes"],
+                        name,
+                        "queries",
+                        old["queries"],
+                        result["queries"],
+                    )
+                )
+            if result["p50_ms"] > old["p50_ms"] * threshold:
+                regressions.append(
+                    (
+                        dataset["recipes"],
+                        name,
+                        "p50_ms",
+                        old["p50_ms"],
+                        result["p50_ms"],
+                    )
+                )
+    return regressions
+
+
+def _getter(client, path, headers):
+    return lambda: client.get(path, **headers)
+
+
+def _ingredient_updater(client, path, headers, amount):
+    """Return a request that replaces all ``amount`` ingredients.
+
+    Two disjoint sets of ingredients alternate, so every request deletes
+    and inserts ``amount`` rows.
+    """
+    ingredient_ids = list(
+        Ingredient.objects.order_by("pk").values_list("pk", flat=True)[
+            : amount * 2
+        ]
+    )
+    bodies = itertools.cycle(
+        json.dumps(
+            {"ingredients": [{"id": pk, "amount": 1} for pk in ingredients]}
+        )
+        for ingredients in (
+            ingredient_ids[:amount],
+            ingredient_ids[amount:],
+        )
+    )
+    return lambda: client.patch(
+        path, next(bodies), content_type="application/json", **headers
+    )
+
+
+def _request(send):
+    started = time.perf_counter()
+    consume(send())
+    return (time.perf_counter() - started) * 1000
+
+
+def _count_queries(send):
+    response, queries = capture_queries(send)
+    return len(queries), response.status_code
+
+
+def capture_queries(make_request):
+    """Return the response of ``make_request()`` and the SQL it ran."""
+    contexts = [
+        CaptureQueriesContext(connections[alias])
+        for alias in (DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS)
+    ]
+    for context in contexts:
+        context.__enter__()
+    try:
+        response = make_request()
+        consume(response)
+    finally:
+        for context in contexts:
+            context.__exit__(None, None, None)
+    return response, [
+        query["sql"]
+        for context in contexts
+        for query in context.captured_queries
+    ]
+
+
+def consume(response):
+    if response.streaming:
+        b"".join(response.streaming_content)
+    else:
+        response.content
+
+
+def _link(model, user_ids, recipe_ids, per_user, rng):
+    per_user = min(per_user, len(recipe_ids))
+    return _bulk_create(
+        model,
+        (
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id in user_ids
+            for recipe_id in rng.sample(recipe_ids, per_user)
+        ),
+    )
+
+
+def _follow(follower_ids, author_ids, per_user, rng):
+    per_user = min(per_user, len(author_ids) - 1)
+    return _bulk_create(
+        Follow,
+        (
+            Follow(follower_id=follower_id, author_id=author_id)
+            for follower_id in follower_ids
+            for author_id in _sample_others(
+                author_ids, follower_id, per_user, rng
+            )
+        ),
+    )
+
+
+def _sample_others(population, excluded, amount, rng):
+    sample = rng.sample(population, amount + 1)
+    return [pk for pk in sample if pk != excluded][:amount]
+
+
+def _bulk_create(model, rows):
+    """Insert rows from a generator in batches, without listing them all."""
+    created = 0
+    while True:
+        batch = list(itertools.islice(rows, BATCH_SIZE))
+        if not batch:
+            return created
+        model.objects.bulk_create(batch)
+        created += len(batch)
+
+
+def _reset_benchmark_user(user, recipe_ids, author_ids, rng):
+    """Give the benchmark user the same amount of data at every size."""
+    FavoriteRecipe.objects.filter(user=user).delete()
+    Busket.objects.filter(user=user).delete()
+    Follow.objects.filter(follower=user).delete()
+
+    _link(FavoriteRecipe, [user.pk], recipe_ids, BENCHMARK_FAVORITES, rng)
+    _link(Busket, [user.pk], recipe_ids, BENCHMARK_CARTS, rng)
+    authors = [pk for pk in author_ids if pk != user.pk]
+    _follow([user.pk], authors, BENCHMARK_FOLLOWS, rng)
+
+
+def _benchmark_caches():
+    default = dict(settings.CACHES["default"], KEY_PREFIX=CACHE_KEY_PREFIX)
+    return {**settings.CACHES, "default": default}
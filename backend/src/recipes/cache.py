@@ -0,0 +1,161 @@
+import hashlib
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import prefetch_related_objects
+
+from main import metrics
+from main.conditional import get_versions, user_scope
+from main.routers import read_from_primary
+from users.models import Follow
+
+from .models import Busket, FavoriteRecipe, Recipe, RecipeQuerySet
+
+RECIPE_CARD_KEY = "recipes:card:{}"
+PAGE_KEY = "recipes:page:{}"
+USER_FLAGS_KEY = "recipes:flags:{}:{}"
+HITS_KEY = "recipes:card:hits"
+MISSES_KEY = "recipes:card:misses"
+
+UserFlags = namedtuple("UserFlags", ("favorites", "cart", "follows"))
+NO_FLAGS = UserFlags(frozenset(), frozenset(), frozenset())
+
+
+def get_recipe_cards(recipes, render):
+    """Return cached user-independent representations of the recipes.
+
+    Missing cards are rendered with ``render`` from the primary after a
+    single bulk prefetch and written back to the cache in one call. Recipes
+    the primary no longer has are rendered but not cached.
+    """
+    keys = {RECIPE_CARD_KEY.format(recipe.id): recipe for recipe in recipes}
+    cards = cache.get_many(keys)
+    missing = [recipe for key, recipe in keys.items() if key not in cards]
+
+    if missing:
+        with read_from_primary():
+            missing = _reload_from_primary(missing)
+            prefetch_related_objects(
+                missing, "author", *RecipeQuerySet.display_prefetches()
+            )
+            fresh = {
+                RECIPE_CARD_KEY.format(recipe.id): render(recipe)
+                for recipe in missing
+            }
+        current = {
+            RECIPE_CARD_KEY.format(recipe.id)
+            for recipe in missing
+            if recipe._state.db == DEFAULT_DB_ALIAS
+        }
+        cache.set_many(
+            {key: card for key, card in fresh.items() if key in current},
+            timeout=settings.RECIPE_CACHE_TIMEOUT,
+        )
+        cards.update(fresh)
+
+    _count(HITS_KEY, len(keys) - len(missing))
+    _count(MISSES_KEY, len(missing))
+    metrics.count_cache(
+        "recipe_card", hits=len(keys) - len(missing), misses=len(missing)
+    )
+    return [cards[RECIPE_CARD_KEY.format(recipe.id)] for recipe in recipes]
+
+
+def _reload_from_primary(recipes):
+    """Replace recipes read from a replica with their rows on the primary."""
+    replicated = [
+        recipe.id for recipe in recipes if recipe._state.db != DEFAULT_DB_ALIAS
+    ]
+    if not replicated:
+        return recipes
+    current = Recipe.objects.defer("search_vector").in_bulk(replicated)
+    return [current.get(recipe.id, recipe) for recipe in recipes]
+
+
+def invalidate_recipe_cards(recipe_ids):
+    keys = [RECIPE_CARD_KEY.format(recipe_id) for recipe_id in recipe_ids]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_shared_page(parts, render):
+    """Return a page shared by all users, rendering it with ``render``.
+
+    ``parts`` must identify everything the page depends on except the
+    user, since per-user flags are overlaid on top of the cached page.
+    """
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    key = PAGE_KEY.format(digest)
+    page = cache.get(key)
+    if page is None:
+        metrics.count_cache("recipe_page", misses=1)
+        with read_from_primary():
+            page = render()
+        cache.set(key, page, timeout=settings.RECIPE_PAGE_CACHE_TIMEOUT)
+    else:
+        metrics.count_cache("recipe_page", hits=1)
+    return page
+
+
+def get_user_flags(user):
+    """Return ids of the user's favorites, cart recipes and followed authors.
+
+    The sets are cached under the user's version, which is bumped whenever
+    any of them changes, so a stale set is never read back.
+    """
+    if user is None or user.is_anonymous:
+        return NO_FLAGS
+
+    scope = user_scope(user.pk)
+    key = USER_FLAGS_KEY.format(user.pk, get_versions(scope)[scope])
+    flags = cache.get(key)
+    if flags is not None:
+        metrics.count_cache("user_flags", hits=1)
+    else:
+        metrics.count_cache("user_flags", misses=1)
+        with read_from_primary():
+            flags = _load_user_flags(user)
+        cache.set(key, flags, timeout=settings.RECIPE_USER_FLAGS_TIMEOUT)
+    return flags
+
+
+def _load_user_flags(user):
+    return UserFlags(
+        favorites=frozenset(
+            FavoriteRecipe.objects.filter(user=user).values_list(
+                "recipe_id", flat=True
+            )
+        ),
+        cart=frozenset(
+            Busket.objects.filter(user=user).values_list(
+                "recipe_id", flat=True
+            )
+        ),
+        follows=frozenset(
+            Follow.objects.filter(follower=user).values_list(
+                "author_id", flat=True
+            )
+        ),
+    )
+
+
+def get_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    return {"hits": hits, "misses": misses}
+
+
+def reset_stats():
+    cache.delete_many((HITS_KEY, MISSES_KEY))
+
+
+def _count(key, delta):
+    if not delta:
+        return
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, timeout=None)
@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import AuthorStats, Follow
+
+from .models import (
+    Busket,
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+)
+
+User = get_user_model()
+
+# (model holding the counter, counter field, counted model, its foreign key)
+COUNTERS = (
+    (Recipe, "favorites_count", FavoriteRecipe, "recipe"),
+    (Recipe, "carts_count", Busket, "recipe"),
+    (Ingredient, "recipes_count", RecipeIngredient, "ingredient"),
+    (AuthorStats, "recipes_count", Recipe, "author"),
+    (AuthorStats, "followers_count", Follow, "author"),
+)
+
+
+def shift(model, field, pks, delta=1):
+    """Add ``delta`` to the counter of the given rows in one UPDATE.
+
+    The change is an ``F()`` expression, so concurrent updates never lose
+    increments. Decrements stop at zero instead of violating the
+    non-negative constraint; the repair command fixes any drift.
+    """
+    pks = list(pks)
+    if not pks or not delta:
+        return
+
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f"{field}__gte": -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def recount():
+    """Recompute every counter in bulk, return the number of fixed rows."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        "pk", flat=True
+    )
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk) for pk in missing), ignore_conflicts=True
+    )
+
+    fixed = {}
+    for model, field, counted, foreign_key in COUNTERS:
+        expected = _count(counted, foreign_key)
+        fixed[f"{model._meta.label}.{field}"] = model.objects.exclude(
+            **{field: expected}
+        ).update(**{field: expected})
+    return fixed
+
+
+def _count(model, foreign_key):
+    counts = (
+        model.objects.filter(**{foreign_key: OuterRef("pk")})
+        .order_by()
+        .values(foreign_key)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
@@ -0,0 +1,248 @@
+"""Fan-out-on-write timelines for the subscription feed.
+
+A new recipe is pushed into ``TimelineEntry`` rows of its author's
+followers in batches, so reading a feed is a range scan over one user's
+entries. Timelines keep the newest ``FEED_TIMELINE_SIZE`` entries. Authors
+with more than ``FEED_FANOUT_MAX_FOLLOWERS`` followers are not fanned out;
+their recipes are pulled into the feed on read instead. When such an author
+drops back to the limit, the followers' timelines are refilled with the
+recipes posted while they were pulled.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from users.models import AuthorStats, Follow
+
+from .models import Recipe, TimelineEntry
+
+logger = logging.getLogger(__name__)
+
+TIMELINE = TimelineEntry._meta.db_table
+RECIPE = Recipe._meta.db_table
+
+BACKFILL_SQL = f"""
+    INSERT INTO {TIMELINE} (user_id, recipe_id)
+    SELECT %s, id FROM {RECIPE}
+    WHERE author_id = %s
+    ORDER BY id DESC
+    LIMIT %s
+    ON CONFLICT DO NOTHING
+"""
+
+REFILL_SQL = f"""
+    INSERT INTO {TIMELINE} (user_id, recipe_id)
+    SELECT follower.user_id, latest.id
+    FROM unnest(%s::integer[]) AS follower(user_id)
+    CROSS JOIN (
+        SELECT id FROM {RECIPE}
+        WHERE author_id = %s
+        ORDER BY id DESC
+        LIMIT %s
+    ) AS latest
+    ON CONFLICT DO NOTHING
+"""
+
+TRIM_SQL = f"""
+    DELETE FROM {TIMELINE} AS entry
+    USING (
+        SELECT owner.user_id, (
+            SELECT recipe_id FROM {TIMELINE}
+            WHERE user_id = owner.user_id
+            ORDER BY recipe_id DESC
+            OFFSET %s LIMIT 1
+        ) AS cutoff
+        FROM unnest(%s::integer[]) AS owner(user_id)
+    ) AS bound
+    WHERE entry.user_id = bound.user_id AND entry.recipe_id <= bound.cutoff
+"""
+
+REBUILD_SQL = f"""
+    INSERT INTO {TIMELINE} (user_id, recipe_id)
+    SELECT follower_id, recipe_id FROM (
+        SELECT
+            follow.follower_id,
+            recipe.id AS recipe_id,
+            ROW_NUMBER() OVER (
+                PARTITION BY follow.follower_id ORDER BY recipe.id DESC
+            ) AS position
+        FROM {Follow._meta.db_table} AS follow
+        JOIN {RECIPE} AS recipe ON recipe.author_id = follow.author_id
+        JOIN {AuthorStats._meta.db_table} AS stats
+            ON stats.user_id = follow.author_id
+        WHERE stats.followers_count <= %s
+    ) AS ranked
+    WHERE position <= %s
+"""
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recipe-feed")
+
+
+def feed_for(queryset, user):
+    """Narrow ``queryset`` to the recipes in the user's feed."""
+    pulled = list(
+        Follow.objects.filter(
+            follower=user,
+            author__stats__followers_count__gt=(
+                settings.FEED_FANOUT_MAX_FOLLOWERS
+            ),
+        ).values_list("author_id", flat=True)
+    )
+    if not pulled:
+        return queryset.filter(timeline_entries__user=user)
+
+    pushed = TimelineEntry.objects.filter(user=user).values("recipe_id")
+    return queryset.filter(Q(pk__in=pushed) | Q(author_id__in=pulled))
+
+
+def is_fanned_out(author_id):
+    followers = (
+        AuthorStats.objects.filter(user_id=author_id)
+        .values_list("followers_count", flat=True)
+        .first()
+    )
+    return (followers or 0) <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+
+def schedule_fan_out(recipe_id, author_id):
+    """Push the recipe to the followers once its transaction commits."""
+    if not settings.FEED_FANOUT_ASYNC:
+        transaction.on_commit(lambda: fan_out(recipe_id, author_id))
+        return
+
+    transaction.on_commit(
+        lambda: _executor.submit(_fan_out_in_thread, recipe_id, author_id)
+    )
+
+
+def fan_out(recipe_id, author_id):
+    if not is_fanned_out(author_id):
+        return
+
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    last_follower_id = 0
+    while True:
+        follower_ids = list(
+            Follow.objects.filter(
+                author_id=author_id, follower_id__gt=last_follower_id
+            )
+            .order_by("follower_id")
+            .values_list("follower_id", flat=True)[:batch_size]
+        )
+        if not follower_ids:
+            return
+
+        TimelineEntry.objects.bulk_create(
+            (
+                TimelineEntry(user_id=follower_id, recipe_id=recipe_id)
+                for follower_id in follower_ids
+            ),
+            ignore_conflicts=True,
+        )
+        trim(follower_ids)
+        if len(follower_ids) < batch_size:
+            return
+        last_follower_id = follower_ids[-1]
+
+
+def schedule_refill(author_id):
+    """Refill the timelines if the author is fanned out again on commit.
+
+    Called before a follow of a pulled author is deleted: recipes posted
+    while the author was pulled never reached the timelines, and would
+    disappear from the feed once reading switches back to timelines.
+    """
+    if is_fanned_out(author_id):
+        return
+
+    def refill_if_fanned_out():
+        if not is_fanned_out(author_id):
+            return
+        if not settings.FEED_FANOUT_ASYNC:
+            refill(author_id)
+            return
+        _executor.submit(_refill_in_thread, author_id)
+
+    transaction.on_commit(refill_if_fanned_out)
+
+
+def refill(author_id):
+    """Push the author's latest recipes to every follower's timeline."""
+    batch_size = settings.FEED_FANOUT_BATCH_SIZE
+    last_follower_id = 0
+    while True:
+        follower_ids = list(
+            Follow.objects.filter(
+                author_id=author_id, follower_id__gt=last_follower_id
+            )
+            .order_by("follower_id")
+            .values_list("follower_id", flat=True)[:batch_size]
+        )
+        if not follower_ids:
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                REFILL_SQL,
+                [follower_ids, author_id, settings.FEED_TIMELINE_SIZE],
+            )
+        trim(follower_ids)
+        if len(follower_ids) < batch_size:
+            return
+        last_follower_id = follower_ids[-1]
+
+
+def backfill(user_id, author_id):
+    """Fill a new follower's timeline with the author's latest recipes."""
+    if not is_fanned_out(author_id):
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            BACKFILL_SQL, [user_id, author_id, settings.FEED_TIMELINE_SIZE]
+        )
+    trim([user_id])
+
+
+def drop(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def trim(user_ids):
+    """Delete everything past the newest ``FEED_TIMELINE_SIZE`` entries."""
+    with connection.cursor() as cursor:
+        cursor.execute(TRIM_SQL, [settings.FEED_TIMELINE_SIZE, list(user_ids)])
+
+
+def rebuild():
+    """Refill every timeline from the follows, after bulk loads."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"TRUNCATE {TIMELINE}")
+        cursor.execute(
+            REBUILD_SQL,
+            [settings.FEED_FANOUT_MAX_FOLLOWERS, settings.FEED_TIMELINE_SIZE],
+        )
+
+
+def _fan_out_in_thread(recipe_id, author_id):
+    try:
+        fan_out(recipe_id, author_id)
+    except Exception:
+        logger.exception("Failed to fan out recipe %s", recipe_id)
+    finally:
+        connection.close()
+
+
+def _refill_in_thread(author_id):
+    try:
+        refill(author_id)
+    except Exception:
+        logger.exception("Failed to refill timelines for author %s", author_id)
+    finally:
+        connection.close()
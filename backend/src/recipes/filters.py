@@ -1,4 +1,9 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+
+from main.pagination import OptInCursorPaginator
 
 from .models import Ingredient, Recipe, Tag
 
@@ -15,6 +20,10 @@ class IngredientFilter(filters.FilterSet):
 
 
 class RecipeFilter(filters.FilterSet):
+    search = filters.CharFilter(
+        method="get_search",
+        label="search",
+    )
     is_favorited = filters.BooleanFilter(
         method="get_is_favorited",
         label="favorite",
@@ -36,13 +45,34 @@ class RecipeFilter(filters.FilterSet):
             "author",
             "is_favorited",
             "is_in_shopping_cart",
+            "search",
         )
 
     def get_is_favorited(self, queryset, name, value):
+        if self.request.user.is_anonymous:
+            return queryset.none() if value else queryset
         if value:
             return queryset.filter(in_favorite__user=self.request.user)
         return queryset.exclude(in_favorite__user=self.request.user)
 
     def get_is_in_shopping_cart(self, queryset, name, value):
+        if self.request.user.is_anonymous:
+            return queryset.none() if value else queryset
         if value:
-            return Recipe.objects.filter(basket_set__user=self.request.user)
+            return queryset.filter(basket_set__user=self.request.user)
+        return queryset.exclude(basket_set__user=self.request.user)
+
+    def get_search(self, queryset, name, value):
+        # Cursor pages are ordered by -id, which would silently replace the
+        # ranking, so the combination is refused.
+        if OptInCursorPaginator().wants_cursor(self.request):
+            raise ValidationError(
+                {"search": "Поиск не совмещается с pagination=cursor"}
+            )
+
+        query = SearchQuery(value, config="russian")
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F("search_vector"), query))
+            .order_by("-search_rank", "-id")
+        )
@@ -0,0 +1,177 @@
+import base64
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageFilter, ImageOps
+
+from main.conditional import bump_versions
+
+from .cache import invalidate_recipe_cards
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    "thumbnail": (160, 160),
+    "card": (480, 480),
+    "detail": (1280, 1280),
+}
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+PLACEHOLDER_SIZE = (16, 16)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix="recipe-images",
+)
+
+
+def variant_name(image_name, variant, extension):
+    folder = os.path.basename(image_name).replace(".", "_")
+    return f"recipes/variants/{folder}/{variant}.{extension}"
+
+
+def variant_urls(recipe):
+    """Return URLs of the generated variants, or ``None`` if not built yet."""
+    if not recipe.image or recipe.image_variants_source != recipe.image.name:
+        return None
+
+    return {
+        variant: {
+            extension: default_storage.url(
+                variant_name(recipe.image.name, variant, extension)
+            )
+            for extension in FORMATS
+        }
+        for variant in VARIANTS
+    }
+
+
+def schedule_variants(recipe_id):
+    """Build the variants in a background thread once the upload commits."""
+    if not settings.RECIPE_IMAGE_VARIANTS_ASYNC:
+        transaction.on_commit(lambda: generate_variants(recipe_id))
+        return
+
+    transaction.on_commit(
+        lambda: _executor.submit(_run_in_thread, generate_variants, recipe_id)
+    )
+
+
+def schedule_cleanup(source_name):
+    """Delete the variants of a replaced or deleted image after commit."""
+    if not source_name:
+        return
+    if not settings.RECIPE_IMAGE_VARIANTS_ASYNC:
+        transaction.on_commit(lambda: delete_unused_variants(source_name))
+        return
+
+    transaction.on_commit(
+        lambda: _executor.submit(
+            _run_in_thread, delete_unused_variants, source_name
+        )
+    )
+
+
+def generate_variants(recipe_id):
+    recipe = Recipe.objects.only("id", "image", "image_variants_source").get(
+        pk=recipe_id
+    )
+    source_name = recipe.image.name
+    previous_source = recipe.image_variants_source
+    placeholder = build_variants(source_name)
+
+    updated = Recipe.objects.filter(pk=recipe_id, image=source_name).update(
+        image_variants_source=source_name,
+        image_placeholder=placeholder,
+        updated_at=timezone.now(),
+    )
+    if updated:
+        invalidate_recipe_cards([recipe_id])
+        bump_versions("recipes")
+        if previous_source != source_name:
+            delete_unused_variants(previous_source)
+    else:
+        # The image was replaced while the variants were being built.
+        delete_unused_variants(source_name)
+
+
+def delete_unused_variants(source_name):
+    """Delete the variants of ``source_name`` unless a recipe still uses it.
+
+    Seeded recipes share their images, so variants are only removed once
+    no recipe shows that image or has it waiting for its variants.
+    """
+    if not source_name:
+        return
+    if Recipe.objects.filter(
+        Q(image=source_name) | Q(image_variants_source=source_name)
+    ).exists():
+        return
+
+    for variant in VARIANTS:
+        for extension in FORMATS:
+            default_storage.delete(
+                variant_name(source_name, variant, extension)
+            )
+
+
+def build_variants(source_name):
+    """Save the resized copies of a stored image, return its placeholder."""
+    with default_storage.open(source_name, "rb") as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = _flatten(image)
+
+    for variant, size in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        for extension, (image_format, options) in FORMATS.items():
+            name = variant_name(source_name, variant, extension)
+            _save(resized, name, image_format, options)
+    return _placeholder(image)
+
+
+def _run_in_thread(function, argument):
+    try:
+        function(argument)
+    except Exception:
+        logger.exception("%s failed for %s", function.__name__, argument)
+    finally:
+        connection.close()
+
+
+def _flatten(image):
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def _save(image, name, image_format, options):
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def _placeholder(image):
+    tiny = image.copy()
+    tiny.thumbnail(PLACEHOLDER_SIZE)
+    tiny = tiny.filter(ImageFilter.GaussianBlur(radius=1))
+    buffer = BytesIO()
+    tiny.save(buffer, format="WEBP", quality=30)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/webp;base64,{encoded}"
@@ -0,0 +1,148 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from recipes import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure latency and query count of the API endpoints "
+        "on synthetic datasets in a separate test database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10000],
+            help="Numbers of recipes in the datasets, e.g. 10000 100000",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Timed requests per endpoint",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the random data generator",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes that generate the datasets in parallel",
+        )
+        parser.add_argument(
+            "--output",
+            help="Write the JSON results to this file instead of stdout",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database, so the next run skips seeding",
+        )
+        parser.add_argument(
+            "--compare",
+            help="JSON results of an earlier run to compare against",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=1.25,
+            help="Allowed growth of the median latency when comparing",
+        )
+
+    def handle(self, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be greater than 0")
+        if min(options["sizes"]) < 1:
+            raise CommandError("--sizes must be greater than 0")
+
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"]) as file:
+                baseline = json.load(file)
+
+        results = {
+            "meta": {
+                "commit": _git_commit(),
+                "started_at": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "repeat": options["repeat"],
+                "seed": options["seed"],
+            },
+            "datasets": [],
+        }
+
+        with benchmark.test_database(
+            keepdb=options["keepdb"], verbosity=options["verbosity"]
+        ):
+            for size in sorted(set(options["sizes"])):
+                results["datasets"].append(self.run_dataset(size, options))
+
+        output = json.dumps(results, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+            self.stdout.write(
+                self.style.SUCCESS(f"Results written to {options['output']}")
+            )
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            self.report_regressions(baseline, results, options["threshold"])
+
+    def run_dataset(self, size, options):
+        self.stderr.write(f"Seeding {size} recipes...")
+        started = time.perf_counter()
+        added = benchmark.seed(
+            size, seed=options["seed"], workers=options["workers"]
+        )
+        seeded_in = time.perf_counter() - started
+
+        self.stderr.write(
+            f"Measuring {len(benchmark.ENDPOINTS)} endpoints and "
+            f"{len(benchmark.INGREDIENT_UPDATES)} ingredient updates..."
+        )
+        return {
+            "recipes": size,
+            "added": added,
+            "seed_seconds": round(seeded_in, 3),
+            "results": benchmark.run(options["repeat"]),
+        }
+
+    def report_regressions(self, baseline, results, threshold):
+        regressions = benchmark.compare(baseline, results, threshold)
+        for size, name, metric, before, after in regressions:
+            self.stderr.write(
+                self.style.WARNING(
+                    f"{size} recipes, {name}: {metric} {before} -> {after}"
+                )
+            )
+        if regressions:
+            raise CommandError(f"Found {len(regressions)} regressions")
+        self.stderr.write(self.style.SUCCESS("No regressions found"))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
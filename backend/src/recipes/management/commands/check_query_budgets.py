@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import benchmark, query_budgets
+
+
+class Command(BaseCommand):
+    help = (
+        "Record the query count of every API route as the budgets checked "
+        "by recipes.tests.test_query_budgets"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--update",
+            action="store_true",
+            help="Write the measured budgets to the baseline file",
+        )
+        parser.add_argument(
+            "--baseline",
+            default=query_budgets.BASELINE_PATH,
+            help="Path to the baseline file",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the test database between runs",
+        )
+
+    def handle(self, **options):
+        if not options["update"]:
+            raise CommandError(
+                "The budgets are checked by the test suite: "
+                "manage.py test recipes.tests.test_query_budgets. "
+                "Run with --update to record new budgets"
+            )
+
+        with benchmark.test_database(
+            keepdb=options["keepdb"], verbosity=options["verbosity"]
+        ):
+            benchmark.seed(query_budgets.DATASET_RECIPES)
+            measurements, skipped = query_budgets.measure_all()
+
+        for name, reason in sorted(skipped.items()):
+            self.stdout.write(f"Skipped {name}: {reason}")
+
+        baseline = query_budgets.build_baseline(measurements)
+        failures = query_budgets.check(measurements, baseline)
+        for failure in failures:
+            self.stdout.write(self.style.ERROR(failure))
+        if failures:
+            raise CommandError(
+                f"{len(failures)} routes run more queries on bigger pages, "
+                "the baseline is not updated"
+            )
+
+        query_budgets.save_baseline(baseline, options["baseline"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recorded budgets of {len(measurements)} routes "
+                f"in {options['baseline']}"
+            )
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from recipes.images import generate_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Build resized image variants and placeholders for recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild variants that already exist",
+        )
+
+    def handle(self, **options):
+        recipes = Recipe.objects.exclude(image="")
+        if not options["force"]:
+            recipes = recipes.exclude(image_variants_source=F("image"))
+
+        built, failed = 0, 0
+        for recipe_id in recipes.values_list("id", flat=True).iterator():
+            try:
+                generate_variants(recipe_id)
+                built += 1
+            except (OSError, ValueError) as error:
+                failed += 1
+                self.stderr.write(f"Recipe {recipe_id}: {error}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully built image variants for {built} recipes, "
+                f"{failed} failed"
+            )
+        )
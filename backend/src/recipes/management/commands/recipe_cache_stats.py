@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from recipes.cache import get_stats, reset_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the recipe card cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the counters after printing them",
+        )
+
+    def handle(self, **options):
+        stats = get_stats()
+        total = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / total if total else 0
+
+        self.stdout.write(
+            f"Hits: {stats['hits']} Misses: {stats['misses']} "
+            f"Hit ratio: {ratio:.2%}"
+        )
+
+        if options["reset"]:
+            reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset"))
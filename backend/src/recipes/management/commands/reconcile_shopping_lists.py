@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import shopping
+
+
+class Command(BaseCommand):
+    help = "Compare shopping list aggregates with the carts they come from"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Rebuild the shopping lists of users with mismatches",
+        )
+
+    def handle(self, **options):
+        mismatches = shopping.find_mismatches()
+        for user_id, ingredient_id, expected, stored in mismatches[:50]:
+            self.stdout.write(
+                f"User {user_id}, ingredient {ingredient_id}: "
+                f"expected {expected}, stored {stored}"
+            )
+
+        if not mismatches:
+            self.stdout.write(
+                self.style.SUCCESS("Shopping lists match the carts")
+            )
+            return
+
+        user_ids = {user_id for user_id, _, _, _ in mismatches}
+        if not options["fix"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Found {len(mismatches)} mismatches "
+                    f"for {len(user_ids)} users, run with --fix to rebuild"
+                )
+            )
+            return
+
+        with transaction.atomic():
+            shopping.rebuild(user_ids)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully rebuilt shopping lists for {len(user_ids)} users"
+            )
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized favorite, cart and recipe counters"
+
+    def handle(self, **options):
+        with transaction.atomic():
+            fixed = counters.recount()
+
+        for counter, rows in fixed.items():
+            self.stdout.write(f"{counter}: fixed {rows} rows")
+        self.stdout.write(self.style.SUCCESS("Counters are up to date"))
@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill database with synthetic users, recipes, favorites, carts "
+        "and follows in bulk"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=50,
+            help="The number of users to be created",
+        )
+        parser.add_argument(
+            "--recipes",
+            type=int,
+            default=100,
+            help="The number of recipes to be created",
+        )
+        parser.add_argument(
+            "--favorites",
+            type=int,
+            default=20,
+            help="Average number of favorite recipes of a new user",
+        )
+        parser.add_argument(
+            "--carts",
+            type=int,
+            default=5,
+            help="Average number of recipes in the cart of a new user",
+        )
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=10,
+            help="Average number of authors a new user follows",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Seed of the random data generator",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes that generate and insert the rows",
+        )
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=seeding.IMAGE_POOL_SIZE,
+            help="Size of the pool of images shared by the recipes",
+        )
+
+    def handle(self, **options):
+        if options["images"] < 1:
+            raise CommandError("--images must be greater than 0")
+
+        started = time.perf_counter()
+        try:
+            added = seeding.generate(
+                options["users"],
+                options["recipes"],
+                favorites=options["favorites"],
+                carts=options["carts"],
+                follows=options["follows"],
+                seed=options["seed"],
+                workers=options["workers"],
+                image_pool=options["images"],
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        summary = ", ".join(f"{count} {name}" for name, count in added.items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully created {summary} "
+                f"in {time.perf_counter() - started:.1f}s"
+            )
+        )
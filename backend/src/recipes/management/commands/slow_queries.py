@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main import slow_queries
+
+
+class Command(BaseCommand):
+    help = "Summarize the slowest query shapes of the slow query log"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file",
+            default=settings.SLOW_QUERY_LOG_FILE,
+            help=(
+                "Path to the slow query log, the files of all workers and "
+                "their backups are read"
+            ),
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=10,
+            help="Number of query shapes to show",
+        )
+        parser.add_argument(
+            "--plans",
+            action="store_true",
+            help="Show the plan of the slowest statement of each shape",
+        )
+
+    def handle(self, **options):
+        summaries = slow_queries.summarize(
+            slow_queries.read_entries(options["file"])
+        )
+        if not summaries:
+            self.stdout.write(f"No slow queries in {options['file']}")
+            return
+
+        for summary in summaries[: options["limit"]]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{summary['count']} x, total "
+                    f"{summary['total_ms']:.1f} ms, max "
+                    f"{summary['max_ms']:.1f} ms, avg "
+                    f"{summary['total_ms'] / summary['count']:.1f} ms"
+                )
+            )
+            self.stdout.write(f"  {summary['shape']}")
+            for action, count in summary["actions"].most_common(3):
+                self.stdout.write(f"  view: {action} ({count})")
+            for frame, count in summary["frames"].most_common(3):
+                self.stdout.write(f"  from: {frame} ({count})")
+            if options["plans"]:
+                for line in summary["slowest"]["plan"] or ():
+                    self.stdout.write(f"    {line}")
+            self.stdout.write("")
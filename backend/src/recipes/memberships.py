@@ -0,0 +1,59 @@
+from django.db import connection, transaction
+
+from main.conditional import bump_versions, user_scope
+
+from . import counters, shopping
+from .models import Busket, FavoriteRecipe, Recipe
+
+COUNTER_FIELDS = {FavoriteRecipe: "favorites_count", Busket: "carts_count"}
+
+INSERT_SQL = """
+    INSERT INTO {table} (user_id, recipe_id)
+    SELECT %s, id FROM {recipes} WHERE id = ANY(%s)
+    ON CONFLICT DO NOTHING
+    RETURNING recipe_id
+"""
+
+DELETE_SQL = """
+    DELETE FROM {table} WHERE user_id = %s AND recipe_id = ANY(%s)
+    RETURNING recipe_id
+"""
+
+
+@transaction.atomic
+def add_recipes(model, user_id, recipe_ids):
+    """Insert the memberships in one statement and return the new ids.
+
+    Rows that already exist are skipped by ``ON CONFLICT DO NOTHING``, and
+    ``RETURNING`` reports exactly which rows this call inserted, which
+    keeps the shopping list aggregate exact under concurrent requests.
+    """
+    sql = INSERT_SQL.format(
+        table=model._meta.db_table, recipes=Recipe._meta.db_table
+    )
+    added = _execute(sql, [user_id, list(recipe_ids)])
+    if model is Busket:
+        shopping.add_to_cart(user_id, added)
+    counters.shift(Recipe, COUNTER_FIELDS[model], added)
+    if added:
+        bump_versions(user_scope(user_id))
+    return added
+
+
+@transaction.atomic
+def remove_recipes(model, user_id, recipe_ids):
+    """Delete the memberships in one statement and return the removed ids."""
+    sql = DELETE_SQL.format(table=model._meta.db_table)
+    removed = _execute(sql, [user_id, list(recipe_ids)])
+    if model is Busket:
+        shopping.remove_from_cart(user_id, removed)
+    counters.shift(Recipe, COUNTER_FIELDS[model], removed, -1)
+    if removed:
+        bump_versions(user_scope(user_id))
+    return removed
+
+
+def _execute(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {recipe_id for (recipe_id,) in cursor.fetchall()}
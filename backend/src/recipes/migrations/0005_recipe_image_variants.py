@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_tags_could_be_blank"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True,
+                editable=False,
+                help_text="Размытая миниатюра в формате data URI",
+                verbose_name="Превью фото",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image_variants_source",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Файл, из которого построены уменьшенные копии фото",
+                max_length=100,
+                verbose_name="Исходник вариантов фото",
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:48
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, transaction
+from django.db.models import Max
+
+BACKFILL_BATCH_SIZE = 10000
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian', coalesce({row}name, '')), 'A') ||
+    setweight(to_tsvector('russian', coalesce({row}text, '')), 'B')
+"""
+
+CREATE_TRIGGER = f"""
+CREATE FUNCTION recipes_recipe_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {SEARCH_VECTOR_SQL.format(row="NEW.")};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_vector_trigger
+BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+FOR EACH ROW EXECUTE PROCEDURE recipes_recipe_search_vector_update();
+"""
+
+BACKFILL = f"""
+UPDATE recipes_recipe SET search_vector = {SEARCH_VECTOR_SQL.format(row="")}
+WHERE id > %s AND id <= %s;
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector_trigger ON recipes_recipe;
+DROP FUNCTION IF EXISTS recipes_recipe_search_vector_update();
+"""
+
+
+def backfill_search_vector(apps, schema_editor):
+    """Fill the vectors of existing recipes in short transactions.
+
+    Each batch of ids commits on its own, so row locks are held briefly
+    and autovacuum can reclaim the old row versions between batches.
+    """
+    Recipe = apps.get_model("recipes", "Recipe")
+    connection = schema_editor.connection
+    last_id = Recipe.objects.aggregate(last_id=Max("id"))["last_id"] or 0
+    for start in range(0, last_id, BACKFILL_BATCH_SIZE):
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(BACKFILL, [start, start + BACKFILL_BATCH_SIZE])
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("recipes", "0005_recipe_image_variants"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False,
+                help_text="Заполняется триггером из названия и описания",
+                null=True,
+                verbose_name="Поисковый вектор",
+            ),
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.RunPython(
+            backfill_search_vector, migrations.RunPython.noop, atomic=False
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="recipe_search_vector"
+            ),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FILL_SHOPPING_LISTS = """
+INSERT INTO recipes_shoppinglistingredient (user_id, ingredient_id, amount)
+SELECT cart.user_id, item.ingredient_id, SUM(item.amount)
+FROM recipes_busket AS cart
+JOIN recipes_recipeingredient AS item ON item.recipe_id = cart.recipe_id
+GROUP BY cart.user_id, item.ingredient_id;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0007_add_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingListIngredient",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.IntegerField(
+                        help_text="Суммарное количество по рецептам из корзины",
+                        verbose_name="Количество",
+                    ),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shopping_lists",
+                        to="recipes.Ingredient",
+                        verbose_name="Ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shopping_list",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ингредиент списка покупок",
+                "verbose_name_plural": "Списки покупок",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="shoppinglistingredient",
+            constraint=models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="shopping_list_ingredient_exists",
+            ),
+        ),
+        migrations.RunSQL(FILL_SHOPPING_LISTS, migrations.RunSQL.noop),
+    ]
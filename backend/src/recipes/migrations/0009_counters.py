@@ -0,0 +1,56 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:57
+
+from django.db import migrations, models
+
+FILL_COUNTERS = """
+UPDATE recipes_recipe AS recipe SET
+    favorites_count = (
+        SELECT COUNT(*) FROM recipes_favoriterecipe
+        WHERE recipe_id = recipe.id
+    ),
+    carts_count = (
+        SELECT COUNT(*) FROM recipes_busket WHERE recipe_id = recipe.id
+    );
+UPDATE recipes_ingredient AS ingredient SET recipes_count = (
+    SELECT COUNT(*) FROM recipes_recipeingredient
+    WHERE ingredient_id = ingredient.id
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_shopping_list_ingredient"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingredient",
+            name="recipes_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Использований в рецептах",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="carts_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Количество добавлений в список покупок",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Количество добавлений в избранное",
+            ),
+        ),
+        migrations.RunSQL(FILL_COUNTERS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 2.2.28 on 2026-10-18 14:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FILL_TIMELINES = """
+INSERT INTO recipes_timelineentry (user_id, recipe_id)
+SELECT follower_id, recipe_id FROM (
+    SELECT
+        follow.follower_id,
+        recipe.id AS recipe_id,
+        ROW_NUMBER() OVER (
+            PARTITION BY follow.follower_id ORDER BY recipe.id DESC
+        ) AS position
+    FROM users_follow AS follow
+    JOIN recipes_recipe AS recipe ON recipe.author_id = follow.author_id
+) AS ranked
+WHERE position <= 1000;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0009_counters"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TimelineEntry",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline_entries",
+                        to="recipes.Recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="timeline",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Подписчик",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Записи ленты",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="timelineentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="timeline_entry_exists"
+            ),
+        ),
+        migrations.RunSQL(FILL_TIMELINES, migrations.RunSQL.noop),
+    ]
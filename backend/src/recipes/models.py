@@ -1,12 +1,51 @@
 import re
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Value,
+    Window,
+)
+from django.db.models.functions import RowNumber
+
+from users.models import Follow
 
 User = get_user_model()
 
 
+class CounterFieldsMixin:
+    """Keep ``save()`` from overwriting counters maintained with ``F()``.
+
+    A full save of an instance loaded earlier would write back counter
+    values that may have changed since, so existing rows are saved with
+    every field except ``counter_fields``.
+    """
+
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        return super().save(*args, **kwargs)
+
+
 class Tag(models.Model):
     name = models.CharField(
         max_length=40,
@@ -34,6 +73,10 @@ class Tag(models.Model):
         help_text="URL адрес тэга",
         verbose_name="Адрес",
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
 
     class Meta:
         ordering = ["-id"]
@@ -44,7 +87,7 @@ class Tag(models.Model):
         return self.name
 
 
-class Ingredient(models.Model):
+class Ingredient(CounterFieldsMixin, models.Model):
     name = models.CharField(
         verbose_name="Название",
         max_length=200,
@@ -55,6 +98,17 @@ class Ingredient(models.Model):
         max_length=35,
         help_text="Единицы измерения",
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Использований в рецептах",
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
+
+    counter_fields = ("recipes_count",)
 
     class Meta:
         verbose_name = "Ингредиент"
@@ -65,7 +119,68 @@ class Ingredient(models.Model):
         return f"{self.name}"
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    @staticmethod
+    def display_prefetches():
+        return (
+            "tags",
+            Prefetch(
+                "recipes",
+                queryset=RecipeIngredient.objects.select_related("ingredient"),
+            ),
+        )
+
+    def with_user_flags(self, user):
+        """Annotate per-user flags instead of querying them per recipe."""
+        if user is None or user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+                is_subscribed=Value(False, output_field=BooleanField()),
+            )
+
+        return self.annotate(
+            is_favorited=Exists(
+                FavoriteRecipe.objects.filter(recipe=OuterRef("pk"), user=user)
+            ),
+            is_in_shopping_cart=Exists(
+                Busket.objects.filter(recipe=OuterRef("pk"), user=user)
+            ),
+            is_subscribed=Exists(
+                Follow.objects.filter(author=OuterRef("author"), follower=user)
+            ),
+        )
+
+    def newest_per_author(self, author_ids, limit=None):
+        """Return the newest ``limit`` recipes of every author in one query.
+
+        Rows are numbered with ``ROW_NUMBER() OVER (PARTITION BY author)``
+        and cut in an outer query, as Django cannot filter on a window
+        annotation. The result is ordered by author, newest first.
+        """
+        if not author_ids:
+            return self.none()
+
+        recipes = self.filter(author_id__in=author_ids)
+        if limit is None:
+            return recipes.order_by("author_id", "-id")
+
+        ranked = recipes.annotate(
+            position=Window(
+                expression=RowNumber(),
+                partition_by=[F("author_id")],
+                order_by=F("id").desc(),
+            )
+        ).order_by()
+        sql, params = ranked.query.sql_with_params()
+        return self.raw(
+            f"SELECT * FROM ({sql}) AS ranked WHERE ranked.position <= %s "
+            "ORDER BY ranked.author_id, ranked.position",
+            (*params, limit),
+        )
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     name = models.CharField(
         verbose_name="Название",
         max_length=200,
@@ -97,6 +212,25 @@ class Recipe(models.Model):
         help_text="Изображение приготовленного блюда",
         verbose_name="Фото блюда",
     )
+    image_variants_source = models.CharField(
+        max_length=100,
+        blank=True,
+        editable=False,
+        verbose_name="Исходник вариантов фото",
+        help_text="Файл, из которого построены уменьшенные копии фото",
+    )
+    image_placeholder = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name="Превью фото",
+        help_text="Размытая миниатюра в формате data URI",
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Поисковый вектор",
+        help_text="Заполняется триггером из названия и описания",
+    )
     cooking_time = models.PositiveSmallIntegerField(
         validators=(
             MinValueValidator(
@@ -107,8 +241,29 @@ class Recipe(models.Model):
         verbose_name="Время приготовления",
         help_text="Задайте время приготовления блюда",
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество добавлений в избранное",
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество добавлений в список покупок",
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения",
+    )
+
+    counter_fields = ("favorites_count", "carts_count")
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="recipe_search_vector"),
+        ]
         ordering = ["-id"]
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
@@ -214,3 +369,63 @@ class Busket(models.Model):
 
     def __str__(self):
         return f"Рецепт {self.recipe} {self.user}"
+
+
+class ShoppingListIngredient(models.Model):
+    user = models.ForeignKey(
+        to=User,
+        on_delete=models.CASCADE,
+        verbose_name="Пользователь",
+        related_name="shopping_list",
+    )
+    ingredient = models.ForeignKey(
+        to=Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name="Ингредиент",
+        related_name="shopping_lists",
+    )
+    amount = models.IntegerField(
+        verbose_name="Количество",
+        help_text="Суммарное количество по рецептам из корзины",
+    )
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=("user", "ingredient"),
+                name="shopping_list_ingredient_exists",
+            ),
+        )
+        verbose_name = "Ингредиент списка покупок"
+        verbose_name_plural = "Списки покупок"
+
+    def __str__(self):
+        return f"{self.user}: {self.ingredient} – {self.amount}"
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        to=User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        to=Recipe,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Рецепт",
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "recipe"),
+                name="timeline_entry_exists",
+            ),
+        ]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+
+    def __str__(self):
+        return f"{self.user}: {self.recipe}"
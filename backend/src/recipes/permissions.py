@@ -1,38 +1,30 @@
 from rest_framework import permissions
 
 
+def is_admin(user):
+    """Check the role loaded with the user, without extra queries."""
+    role = getattr(user, "userrole", None)
+    if role is None:
+        return user.is_superuser
+    return role.is_admin
+
+
 class IsAdminOrReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
-        if not request.user.is_authenticated:
-            return request.method in permissions.SAFE_METHODS
-
-        return any(
-            [
-                request.method in permissions.SAFE_METHODS,
-                request.user.userrole.is_admin,
-            ]
-        )
+        if request.method in permissions.SAFE_METHODS:
+            return True
+
+        return request.user.is_authenticated and is_admin(request.user)
 
     def has_object_permission(self, request, view, obj):
-        if not request.user.is_authenticated:
-            return request.method in permissions.SAFE_METHODS
-
-        return any(
-            [
-                request.method in permissions.SAFE_METHODS,
-                request.user.userrole.is_admin,
-            ]
-        )
+        return self.has_permission(request, view)
 
 
 class IsAuthorOrAdmin(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
-        if request.user.is_authenticated and any(
-            [
-                obj.author == request.user,
-                request.user.userrole.is_admin,
-            ]
-        ):
+        if request.method in permissions.SAFE_METHODS:
             return True
 
-        return request.method in permissions.SAFE_METHODS
+        return request.user.is_authenticated and (
+            obj.author_id == request.user.pk or is_admin(request.user)
+        )
@@ -0,0 +1,318 @@
+"""Query-count budgets of every API route.
+
+Each route of ``recipes.urls`` and ``users.urls`` is requested by an
+anonymous and an authenticated user at two page sizes, on a small seeded
+dataset and with a cold cache. The highest query count and the set of
+query shapes (statement and first table) make up the route's budget. A
+route fails when it runs more queries on the bigger page, which is how an
+N+1 in a serializer shows up, when it exceeds its recorded budget, or when
+it runs a kind of query the baseline has never seen. The response status
+is recorded too, so a route that starts failing can't pass on the few
+queries of its error response.
+
+The check runs in ``recipes.tests.test_query_budgets``; the baseline is
+recorded with ``manage.py check_query_budgets --update``.
+"""
+
+import json
+import os
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.test import Client
+from django.urls import NoReverseMatch, URLResolver, get_resolver, reverse
+from rest_framework.authtoken.models import Token
+
+from users.models import Follow
+
+from . import benchmark
+from .models import Busket, FavoriteRecipe, Ingredient, Recipe, Tag
+
+BASELINE_PATH = os.path.join(settings.BASE_DIR, "query_budgets.json")
+NAMESPACES = ("api_recipes", "api_users")
+PAGE_SIZES = (2, 10)
+DATASET_RECIPES = 200
+METHODS = ("get", "post", "put", "patch", "delete")
+
+SHAPE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)', re.IGNORECASE)
+SAVEPOINT_RE = re.compile(
+    r"^\s*(?:SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b",
+    re.IGNORECASE,
+)
+
+# Writes are measured in pairs inside a rolled back transaction, so the
+# second request undoes the first and the dataset stays the same. Bulk
+# routes get as many recipes as the page size.
+WRITES = {
+    "api_recipes:recipes-favorite": ("post", "delete"),
+    "api_recipes:recipes-shopping-cart": ("post", "delete"),
+    "api_recipes:recipes-bulk-favorite": ("post", "delete"),
+    "api_recipes:recipes-bulk-shopping-cart": ("post", "delete"),
+    "api_users:follow-author": ("post", "delete"),
+}
+BULK_ROUTES = (
+    "api_recipes:recipes-bulk-favorite",
+    "api_recipes:recipes-bulk-shopping-cart",
+)
+
+
+def collect_routes():
+    """Return ``{route name: allowed methods}`` of the API namespaces."""
+    routes = {}
+    for namespace, pattern in _walk(get_resolver().url_patterns):
+        if namespace not in NAMESPACES or not pattern.name:
+            continue
+        if "format" in pattern.pattern.regex.groupindex:
+            continue
+
+        callback = pattern.callback
+        actions = getattr(callback, "actions", None)
+        if actions is not None:
+            methods = set(actions)
+        else:
+            view_class = getattr(callback, "cls", None)
+            methods = {
+                method for method in METHODS if hasattr(view_class, method)
+            }
+        name = f"{namespace}:{pattern.name}"
+        routes.setdefault(name, set()).update(methods)
+    return routes
+
+
+def sample_kwargs(user):
+    """URL arguments of the detail routes, picked from the seeded data."""
+    favorites = FavoriteRecipe.objects.filter(user=user).values("recipe_id")
+    carts = Busket.objects.filter(user=user).values("recipe_id")
+    recipe_id = Recipe.objects.order_by("pk").values_list("pk", flat=True)[0]
+    free_recipe_id = (
+        Recipe.objects.exclude(pk__in=favorites)
+        .exclude(pk__in=carts)
+        .order_by("pk")
+        .values_list("pk", flat=True)[0]
+    )
+    followed_id = (
+        Follow.objects.filter(follower=user)
+        .order_by("author_id")
+        .values_list("author_id", flat=True)[0]
+    )
+    unfollowed_id = (
+        Recipe.objects.exclude(author_id=user.pk)
+        .exclude(author__author__follower=user)
+        .order_by("author_id")
+        .values_list("author_id", flat=True)[0]
+    )
+    return {
+        "api_recipes:recipes-detail": {"pk": recipe_id},
+        "api_recipes:recipes-favorite": {"pk": free_recipe_id},
+        "api_recipes:recipes-shopping-cart": {"pk": free_recipe_id},
+        "api_recipes:tags-detail": {
+            "pk": Tag.objects.order_by("pk").values_list("pk", flat=True)[0]
+        },
+        "api_recipes:ingredients-detail": {
+            "pk": Ingredient.objects.order_by("pk").values_list(
+                "pk", flat=True
+            )[0]
+        },
+        "api_users:subscriptions-detail": {"pk": followed_id},
+        "api_users:user-detail": {"id": followed_id},
+        "api_users:follow-author": {"id": unfollowed_id},
+    }
+
+
+def measure_all():
+    """Return the measurements and ``{route: reason}`` of skipped routes."""
+    user = benchmark.get_benchmark_user()
+    token, _ = Token.objects.get_or_create(user=user)
+    kwargs = sample_kwargs(user)
+    free_recipe_ids = list(
+        Recipe.objects.exclude(in_favorite__user=user)
+        .exclude(basket_set__user=user)
+        .order_by("pk")
+        .values_list("pk", flat=True)[: max(PAGE_SIZES)]
+    )
+    viewers = (
+        ("anonymous", {}),
+        ("authenticated", {"HTTP_AUTHORIZATION": f"Token {token.key}"}),
+    )
+    client = Client()
+
+    measurements, skipped = {}, {}
+    for name, methods in sorted(collect_routes().items()):
+        try:
+            path = reverse(name, kwargs=kwargs.get(name))
+        except NoReverseMatch:
+            skipped[name] = "no sample URL arguments"
+            continue
+
+        if "get" in methods:
+            for viewer, headers in viewers:
+                measurements[f"GET {name} {viewer}"] = _measure_get(
+                    client, path, headers
+                )
+
+        if name in WRITES:
+            measurements.update(
+                _measure_route_writes(
+                    client, name, path, viewers[1][1], free_recipe_ids
+                )
+            )
+        elif "get" not in methods:
+            skipped[name] = "writes are not measured"
+    return measurements, skipped
+
+
+def build_baseline(measurements):
+    return {
+        "page_sizes": list(PAGE_SIZES),
+        "routes": {
+            key: {
+                "path": measurement["path"],
+                "status": _status(measurement),
+                "queries": max(
+                    result["queries"]
+                    for result in measurement["sizes"].values()
+                ),
+                "shapes": sorted(
+                    {
+                        shape
+                        for result in measurement["sizes"].values()
+                        for shape in result["shapes"]
+                    }
+                ),
+            }
+            for key, measurement in sorted(measurements.items())
+        },
+    }
+
+
+def check(measurements, baseline):
+    """Return the list of human-readable budget violations."""
+    budgets = baseline.get("routes", {})
+    small, large = (str(size) for size in PAGE_SIZES)
+    failures = []
+    for key, measurement in sorted(measurements.items()):
+        sizes = measurement["sizes"]
+        if sizes[large]["queries"] > sizes[small]["queries"]:
+            failures.append(
+                f"{key}: {sizes[small]['queries']} queries for {small} "
+                f"items but {sizes[large]['queries']} for {large}"
+            )
+
+        budget = budgets.get(key)
+        if budget is None:
+            failures.append(f"{key}: no budget recorded")
+            continue
+
+        status = _status(measurement)
+        if status != budget.get("status"):
+            failures.append(
+                f"{key}: status {status}, recorded {budget.get('status')}"
+            )
+
+        queries = max(result["queries"] for result in sizes.values())
+        if queries > budget["queries"]:
+            failures.append(
+                f"{key}: {queries} queries, budget is {budget['queries']}"
+            )
+
+        shapes = {
+            shape for result in sizes.values() for shape in result["shapes"]
+        }
+        unknown = sorted(shapes - set(budget["shapes"]))
+        if unknown:
+            failures.append(f"{key}: new queries {', '.join(unknown)}")
+    return failures
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_baseline(baseline, path=BASELINE_PATH):
+    with open(path, "w") as file:
+        json.dump(baseline, file, ensure_ascii=False, indent=2)
+        file.write("\n")
+
+
+def query_shape(sql):
+    match = SHAPE_RE.search(sql)
+    verb = sql.split(None, 1)[0].upper()
+    return f"{verb} {match.group(1)}" if match else verb
+
+
+def _measure_get(client, path, headers):
+    sizes = {}
+    for size in PAGE_SIZES:
+        url = f"{path}?limit={size}"
+        # The first request warms up process-wide state, such as the
+        # ingredient index, the second one is measured with a cold cache.
+        benchmark.clear_cache()
+        benchmark.consume(client.get(url, **headers))
+        benchmark.clear_cache()
+        sizes[str(size)] = _result(
+            *benchmark.capture_queries(lambda: client.get(url, **headers))
+        )
+    return {"path": path, "sizes": sizes}
+
+
+def _measure_route_writes(client, name, path, headers, recipe_ids):
+    measurements = {}
+    for size in PAGE_SIZES:
+        data = None
+        if name in BULK_ROUTES:
+            data = {"recipes": recipe_ids[:size]}
+        results = _measure_writes(client, path, WRITES[name], headers, data)
+        for method, result in results.items():
+            key = f"{method.upper()} {name} authenticated"
+            measurements.setdefault(key, {"path": path, "sizes": {}})
+            measurements[key]["sizes"][str(size)] = result
+    return measurements
+
+
+def _measure_writes(client, path, methods, headers, data):
+    results = {}
+    with transaction.atomic():
+        for method in methods:
+            benchmark.clear_cache()
+            request = getattr(client, method)
+            results[method] = _result(
+                *benchmark.capture_queries(
+                    lambda: request(
+                        path,
+                        data=json.dumps(data) if data else "",
+                        content_type="application/json",
+                        **headers,
+                    )
+                )
+            )
+        transaction.set_rollback(True)
+    return results
+
+
+def _result(response, queries):
+    queries = [sql for sql in queries if not SAVEPOINT_RE.match(sql)]
+    return {
+        "status": response.status_code,
+        "queries": len(queries),
+        "shapes": sorted({query_shape(sql) for sql in queries}),
+    }
+
+
+def _status(measurement):
+    """Return the response status, or all of them if page sizes differ."""
+    statuses = sorted(
+        {result["status"] for result in measurement["sizes"].values()}
+    )
+    return statuses[0] if len(statuses) == 1 else statuses
+
+
+def _walk(patterns, namespace=None):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(
+                pattern.url_patterns, pattern.namespace or namespace
+            )
+        else:
+            yield namespace, pattern
@@ -0,0 +1,584 @@
+"""Bulk generator of synthetic users, recipes and their links.
+
+``generate`` adds users with roles, recipes with tags and ingredients,
+favorites, cart items and follows. Rows are streamed to Postgres with
+``COPY`` in chunks of ``CHUNK_SIZE`` users or recipes, spread over up to
+``workers`` forked processes. Ids of the new users and recipes are
+reserved from their sequences up front and every chunk draws from its own
+random generator, seeded by ``seed`` and the chunk's position, so the
+same arguments produce the same data whatever the number of workers.
+
+Authors, recipe popularity, followed authors and ingredients follow a
+Zipf distribution, so a few authors write most recipes and a few recipes
+collect most favorites. Images are taken from a small pool of generated
+pictures whose variants are built once.
+
+``COPY`` skips the model signals, so ``refresh`` rebuilds the counters,
+shopping lists and feeds afterwards, like the other bulk paths do.
+"""
+
+import io
+import itertools
+import multiprocessing
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from main.conditional import bump_versions
+from users.models import AuthorStats, Follow, UserRole
+
+from . import counters, feed, images, shopping
+from .models import (
+    Busket,
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
+
+User = get_user_model()
+
+CHUNK_SIZE = 10000
+ZIPF_EXPONENT = 1.1
+IMAGE_POOL_SIZE = 12
+IMAGE_SIZE = (640, 480)
+IMAGE_FOLDER = "recipes/seed"
+USERNAME_PREFIX = "seed"
+UNUSABLE_PASSWORD = "!"
+
+ROLES = (
+    (UserRole.USER, 0.95),
+    (UserRole.MODERATOR, 0.04),
+    (UserRole.ADMIN, 0.01),
+)
+FIRST_NAMES = (
+    "Анна",
+    "Мария",
+    "Елена",
+    "Ольга",
+    "Наталья",
+    "Ирина",
+    "Иван",
+    "Алексей",
+    "Дмитрий",
+    "Сергей",
+    "Андрей",
+    "Михаил",
+)
+LAST_NAMES = (
+    "Иванов",
+    "Смирнов",
+    "Кузнецов",
+    "Попов",
+    "Васильев",
+    "Петров",
+    "Соколов",
+    "Михайлов",
+    "Новиков",
+    "Федоров",
+)
+WORDS = (
+    "курица",
+    "говядина",
+    "рыба",
+    "рис",
+    "гречка",
+    "картофель",
+    "томаты",
+    "сыр",
+    "грибы",
+    "тыква",
+    "яблоки",
+    "творог",
+    "суп",
+    "салат",
+    "пирог",
+    "запеканка",
+    "рагу",
+    "плов",
+    "блины",
+    "соус",
+    "домашний",
+    "быстрый",
+    "острый",
+    "пряный",
+    "летний",
+    "с",
+    "и",
+    "в",
+    "по-деревенски",
+)
+TAGS = (
+    ("Завтрак", "breakfast", "E26C2D"),
+    ("Обед", "lunch", "49B64E"),
+    ("Ужин", "dinner", "8775D2"),
+    ("Десерт", "dessert", "F5C542"),
+    ("Выпечка", "bakery", "A0522D"),
+    ("Веган", "vegan", "2E8B57"),
+)
+COOKING_TIMES = (5, 10, 15, 20, 25, 30, 40, 50, 60, 90, 120)
+AMOUNTS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+# Shared with the forked workers, which inherit it instead of receiving
+# the id lists and samplers through pickling.
+_job = None
+
+
+class ZipfSampler:
+    """Draw items so that the k-th most popular one has weight 1 / k^s.
+
+    Ranks are given to the items by a shuffle, so popularity does not
+    follow the order of the ids.
+    """
+
+    def __init__(self, items, rng, exponent=ZIPF_EXPONENT):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(
+            itertools.accumulate(
+                1 / rank**exponent for rank in range(1, len(self.items) + 1)
+            )
+        )
+
+    def choice(self, rng):
+        return rng.choices(self.items, cum_weights=self.cum_weights)[0]
+
+    def sample(self, rng, amount, excluded=None):
+        """Return up to ``amount`` distinct items other than ``excluded``."""
+        available = len(self.items) - (excluded is not None)
+        amount = min(amount, available)
+        if amount * 2 > available:
+            # Rare items would take too many draws to collect.
+            others = [item for item in self.items if item != excluded]
+            return rng.sample(others, amount)
+
+        chosen = {}
+        while len(chosen) < amount:
+            for item in rng.choices(
+                self.items,
+                cum_weights=self.cum_weights,
+                k=amount - len(chosen),
+            ):
+                if item != excluded:
+                    chosen.setdefault(item)
+        return list(itertools.islice(chosen, amount))
+
+
+def generate(
+    users,
+    recipes,
+    favorites=20,
+    carts=5,
+    follows=10,
+    seed=0,
+    workers=1,
+    image_pool=IMAGE_POOL_SIZE,
+):
+    """Add the data and rebuild what depends on it, return row counts."""
+    added, user_ids = add(
+        users,
+        recipes,
+        favorites=favorites,
+        carts=carts,
+        follows=follows,
+        seed=seed,
+        workers=workers,
+        image_pool=image_pool,
+    )
+    refresh(user_ids)
+    return added
+
+
+def add(
+    users,
+    recipes,
+    favorites=20,
+    carts=5,
+    follows=10,
+    seed=0,
+    workers=1,
+    image_pool=IMAGE_POOL_SIZE,
+):
+    """Insert the rows, return the row counts and the new user ids.
+
+    Every new user gets on average ``favorites`` favorites, ``carts`` cart
+    items and ``follows`` followed authors. Chunks are committed one by
+    one, so this must not run inside a transaction, nor alongside other
+    writes to the users and recipes.
+    """
+    if users < 1:
+        raise ValueError("The number of users must be greater than 0")
+    if recipes < 0:
+        raise ValueError("The number of recipes can't be negative")
+    if connection.in_atomic_block:
+        raise ValueError("Bulk seeding can't run inside a transaction")
+
+    ingredient_ids = list(
+        Ingredient.objects.order_by("pk").values_list("pk", flat=True)
+    )
+    if recipes and not ingredient_ids:
+        raise ValueError("Load the ingredients before seeding recipes")
+
+    rng = random.Random(
+        f"{seed}:{User.objects.count()}:{Recipe.objects.count()}"
+    )
+    tag_ids = ensure_tags()
+    image_names = ensure_images(image_pool)
+    user_ids = _reserve_ids(User, users)
+    recipe_ids = _reserve_ids(Recipe, recipes)
+
+    global _job
+    _job = {
+        "seed": seed,
+        "user_ids": user_ids,
+        "tag_ids": tag_ids,
+        "images": image_names,
+        "averages": {
+            "favorites": favorites,
+            "carts": carts,
+            "follows": follows,
+        },
+        "authors": ZipfSampler(user_ids, rng),
+        "ingredients": ZipfSampler(ingredient_ids, rng),
+    }
+    try:
+        added = {"users": users, "recipes": recipes}
+        _run(workers, _write_users, _chunks(user_ids))
+        _run(workers, _write_recipes, _chunks(recipe_ids))
+
+        _job["recipes"] = ZipfSampler(
+            Recipe.objects.order_by("pk").values_list("pk", flat=True), rng
+        )
+        _job["followed"] = ZipfSampler(
+            User.objects.order_by("pk").values_list("pk", flat=True), rng
+        )
+        for counts in _run(workers, _write_links, _chunks(user_ids)):
+            for name, created in counts.items():
+                added[name] = added.get(name, 0) + created
+    finally:
+        _job = None
+    return added, user_ids
+
+
+def refresh(user_ids):
+    """Rebuild the counters, shopping lists and feeds after ``add``."""
+    with transaction.atomic():
+        counters.recount()
+        shopping.rebuild(user_ids)
+        feed.rebuild()
+        bump_versions("recipes", "tags", "users")
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def ensure_tags():
+    Tag.objects.bulk_create(
+        (Tag(name=name, slug=slug, color=color) for name, slug, color in TAGS),
+        ignore_conflicts=True,
+    )
+    return list(Tag.objects.values_list("pk", flat=True))
+
+
+def ensure_images(amount):
+    """Return ``(name, placeholder)`` of the pool images, drawing new ones.
+
+    Variants of every pool image are built once here, so the recipes
+    that share it come with ready variants and placeholder.
+    """
+    pool = []
+    for number in range(amount):
+        name = f"{IMAGE_FOLDER}/{number}.png"
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(_draw(number)))
+        pool.append((name, images.build_variants(name)))
+    return pool
+
+
+def _draw(number):
+    rng = random.Random(f"image:{number}")
+    width, height = IMAGE_SIZE
+    image = Image.new("RGB", IMAGE_SIZE, _color(rng))
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(3, 8)):
+        left, top = rng.randrange(width), rng.randrange(height)
+        size = rng.randint(40, 200)
+        draw.ellipse((left, top, left + size, top + size), fill=_color(rng))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _color(rng):
+    return tuple(rng.randrange(256) for _ in range(3))
+
+
+def _write_users(user_ids):
+    rng = _chunk_random("users", user_ids)
+    roles, weights = zip(*ROLES)
+    now = timezone.now()
+
+    with _chunk_cursor() as cursor:
+        _copy(
+            cursor,
+            User,
+            (
+                "id",
+                "username",
+                "email",
+                "password",
+                "first_name",
+                "last_name",
+                "is_superuser",
+                "is_staff",
+                "is_active",
+                "date_joined",
+            ),
+            (
+                (
+                    pk,
+                    f"{USERNAME_PREFIX}{pk}",
+                    f"{USERNAME_PREFIX}{pk}@example.com",
+                    UNUSABLE_PASSWORD,
+                    rng.choice(FIRST_NAMES),
+                    rng.choice(LAST_NAMES),
+                    False,
+                    False,
+                    True,
+                    now,
+                )
+                for pk in user_ids
+            ),
+        )
+        _copy(
+            cursor,
+            UserRole,
+            ("user", "role"),
+            zip(user_ids, rng.choices(roles, weights, k=len(user_ids))),
+        )
+        _copy(
+            cursor,
+            AuthorStats,
+            ("user", "recipes_count", "followers_count"),
+            ((pk, 0, 0) for pk in user_ids),
+        )
+    return {}
+
+
+def _write_recipes(recipe_ids):
+    rng = _chunk_random("recipes", recipe_ids)
+    ingredients = _job["ingredients"]
+    now = timezone.now()
+
+    with _chunk_cursor() as cursor:
+        _copy(
+            cursor,
+            Recipe,
+            (
+                "id",
+                "author",
+                "name",
+                "text",
+                "cooking_time",
+                "image",
+                "image_variants_source",
+                "image_placeholder",
+                "favorites_count",
+                "carts_count",
+                "updated_at",
+            ),
+            (_recipe_row(pk, rng, now) for pk in recipe_ids),
+        )
+        _copy(
+            cursor,
+            Recipe.tags.through,
+            ("recipe", "tag"),
+            (
+                (pk, tag_id)
+                for pk in recipe_ids
+                for tag_id in rng.sample(_job["tag_ids"], rng.randint(1, 3))
+            ),
+        )
+        _copy(
+            cursor,
+            RecipeIngredient,
+            ("recipe", "ingredient", "amount"),
+            (
+                (pk, ingredient_id, rng.choice(AMOUNTS))
+                for pk in recipe_ids
+                for ingredient_id in ingredients.sample(rng, rng.randint(3, 8))
+            ),
+        )
+    return {}
+
+
+def _recipe_row(pk, rng, now):
+    image, placeholder = rng.choice(_job["images"])
+    return (
+        pk,
+        _job["authors"].choice(rng),
+        _sentence(rng, 2, 4).capitalize(),
+        _sentence(rng, 15, 40),
+        rng.choice(COOKING_TIMES),
+        image,
+        image,
+        placeholder,
+        0,
+        0,
+        now,
+    )
+
+
+def _write_links(user_ids):
+    rng = _chunk_random("links", user_ids)
+    averages = _job["averages"]
+    recipes, followed = _job["recipes"], _job["followed"]
+
+    counts = {}
+    with _chunk_cursor() as cursor:
+        for name, model in (("favorites", FavoriteRecipe), ("carts", Busket)):
+            counts[name] = _copy(
+                cursor,
+                model,
+                ("user", "recipe"),
+                (
+                    (user_id, recipe_id)
+                    for user_id in user_ids
+                    for recipe_id in recipes.sample(
+                        rng, rng.randint(0, averages[name] * 2)
+                    )
+                ),
+            )
+        counts["follows"] = _copy(
+            cursor,
+            Follow,
+            ("follower", "author"),
+            (
+                (user_id, author_id)
+                for user_id in user_ids
+                for author_id in followed.sample(
+                    rng, rng.randint(0, averages["follows"] * 2), user_id
+                )
+            ),
+        )
+    return counts
+
+
+@contextmanager
+def _chunk_cursor():
+    """Cursor in the transaction of one chunk.
+
+    A lost chunk is generated again by the next run, so its commit does
+    not wait for the disk.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SET LOCAL synchronous_commit TO OFF")
+        yield cursor
+
+
+def _copy(cursor, model, field_names, rows):
+    """Stream tuples of ``field_names`` values to the table with ``COPY``."""
+    buffer = io.StringIO()
+    written = 0
+    for row in rows:
+        buffer.write("\t".join(map(_copy_value, row)))
+        buffer.write("\n")
+        written += 1
+
+    if written:
+        buffer.seek(0)
+        quote_name = connection.ops.quote_name
+        columns = ", ".join(
+            quote_name(model._meta.get_field(name).column)
+            for name in field_names
+        )
+        cursor.copy_expert(
+            f"COPY {quote_name(model._meta.db_table)} ({columns}) "
+            "FROM STDIN",
+            buffer,
+        )
+    return written
+
+
+def _copy_value(value):
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, int):
+        return str(value)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _reserve_ids(model, amount):
+    """Take ``amount`` consecutive ids from the model's sequence."""
+    if not amount:
+        return range(0)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT setval(%(sequence)s, nextval(%(sequence)s) + %(amount)s"
+            " - 1) - %(amount)s + 1",
+            {
+                "sequence": _sequence(cursor, model),
+                "amount": amount,
+            },
+        )
+        first = cursor.fetchone()[0]
+    return range(first, first + amount)
+
+
+def _sequence(cursor, model):
+    cursor.execute(
+        "SELECT pg_get_serial_sequence(%s, %s)",
+        [model._meta.db_table, model._meta.pk.column],
+    )
+    return cursor.fetchone()[0]
+
+
+def _chunks(ids):
+    return [
+        ids[offset:][:CHUNK_SIZE] for offset in range(0, len(ids), CHUNK_SIZE)
+    ]
+
+
+def _chunk_random(kind, ids):
+    return random.Random(f"{_job['seed']}:{kind}:{ids[0]}")
+
+
+def _run(workers, function, chunks):
+    """Call ``function`` for every chunk, in forked processes if allowed."""
+    if workers <= 1 or len(chunks) <= 1:
+        return [function(chunk) for chunk in chunks]
+
+    # Forked workers must not share the connections of this process.
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    with context.Pool(min(workers, len(chunks))) as pool:
+        return pool.starmap(
+            _in_worker, [(function, chunk) for chunk in chunks]
+        )
+
+
+def _in_worker(function, chunk):
+    try:
+        return function(chunk)
+    finally:
+        connections.close_all()
+
+
+def _sentence(rng, shortest, longest):
+    return " ".join(rng.choices(WORDS, k=rng.randint(shortest, longest)))
@@ -1,17 +1,25 @@
+from collections import OrderedDict
+
 from django.contrib.auth import get_user_model
-from django.db.models import F
+from django.db import models, transaction
 from drf_base64.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from users.models import Follow
 from users.serializers import CustomUserSerializer
 
+from . import counters, shopping
+from .cache import get_recipe_cards
+from .images import variant_urls
+from .uploads import verify_image
 from .models import (
     Busket,
     FavoriteRecipe,
     Ingredient,
     Recipe,
     RecipeIngredient,
+    ShoppingListIngredient,
     Tag,
 )
 
@@ -61,6 +69,21 @@ class ShowIngredientsInRecipeSerializer(serializers.ModelSerializer):
         )
 
 
+class ShoppingListIngredientSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source="ingredient.id")
+    name = serializers.ReadOnlyField(source="ingredient.name")
+    unit = serializers.ReadOnlyField(source="ingredient.unit")
+
+    class Meta:
+        model = ShoppingListIngredient
+        fields = (
+            "id",
+            "name",
+            "unit",
+            "amount",
+        )
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
 
@@ -69,6 +92,66 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "image", "cooking_time")
 
 
+class RecipeCardSerializer(serializers.ModelSerializer):
+    """User-independent part of the recipe representation."""
+
+    tags = TagSerializer(many=True, read_only=True)
+    author = CustomUserSerializer(read_only=True)
+    ingredients = serializers.SerializerMethodField()
+    image = serializers.ImageField(read_only=True)
+    image_variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = (
+            "id",
+            "tags",
+            "author",
+            "ingredients",
+            "name",
+            "image",
+            "image_variants",
+            "image_placeholder",
+            "text",
+            "cooking_time",
+        )
+
+    def get_ingredients(self, obj):
+        ingredients = obj.recipes.all()
+        return ShowIngredientsInRecipeSerializer(ingredients, many=True).data
+
+    def get_image_variants(self, obj):
+        return variant_urls(obj)
+
+
+class CachedRecipeListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        recipes = list(iterable)
+        cards = get_recipe_cards(recipes, render=_render_card)
+        return [
+            self.child.personalize(recipe, card)
+            for recipe, card in zip(recipes, cards)
+        ]
+
+
+def overlay_user_flags(page, flags):
+    """Copy a shared page with the user's flags set on every recipe."""
+    results = []
+    for recipe in page["results"]:
+        author = dict(recipe["author"])
+        author["is_subscribed"] = author["id"] in flags.follows
+        recipe = OrderedDict(recipe)
+        recipe["author"] = author
+        recipe["is_favorited"] = recipe["id"] in flags.favorites
+        recipe["is_in_shopping_cart"] = recipe["id"] in flags.cart
+        results.append(recipe)
+
+    page = OrderedDict(page)
+    page["results"] = results
+    return page
+
+
 class AddShowRecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
@@ -76,6 +159,7 @@ class AddShowRecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     image = Base64ImageField()
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
@@ -88,15 +172,73 @@ class AddShowRecipeSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
+            "image_placeholder",
             "text",
             "cooking_time",
         )
+        list_serializer_class = CachedRecipeListSerializer
+
+    def to_representation(self, instance):
+        (card,) = get_recipe_cards([instance], render=_render_card)
+        return self.personalize(instance, card)
+
+    def personalize(self, recipe, card):
+        """Combine a cached recipe card with the requesting user's flags.
+
+        When the view asks for an ``image_variant`` and the variants are
+        built, ``image`` points at that variant instead of the original.
+        """
+        author = dict(card["author"])
+        author["is_subscribed"] = self.get_is_subscribed(recipe)
+        variants = card["image_variants"]
+        image = card["image"]
+        if variants and self.context.get("image_variant") in variants:
+            image = variants[self.context["image_variant"]]["webp"]
+        if variants:
+            variants = {
+                variant: {
+                    extension: self._absolute_url(url)
+                    for extension, url in urls.items()
+                }
+                for variant, urls in variants.items()
+            }
+
+        overlay = {
+            "author": author,
+            "image": self._absolute_url(image),
+            "image_variants": variants,
+            "is_favorited": self.get_is_favorited(recipe),
+            "is_in_shopping_cart": self.get_is_in_shopping_cart(recipe),
+        }
+        return OrderedDict(
+            (field, overlay[field] if field in overlay else card[field])
+            for field in self.Meta.fields
+        )
 
     def get_ingredients(self, obj):
-        ingredients = RecipeIngredient.objects.filter(recipe=obj)
+        ingredients = obj.recipes.all()
         return ShowIngredientsInRecipeSerializer(ingredients, many=True).data
 
+    def get_image_variants(self, obj):
+        return variant_urls(obj)
+
+    def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
+
+        request = self.context.get("request")
+        if not request or request.user.is_anonymous:
+            return False
+
+        return Follow.objects.filter(
+            follower=request.user, author_id=obj.author_id
+        ).exists()
+
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
+
         request = self.context.get("request")
         if not request or request.user.is_anonymous:
             return False
@@ -106,15 +248,28 @@ class AddShowRecipeSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
+
         request = self.context.get("request")
         if not request or request.user.is_anonymous:
             return False
 
         return Busket.objects.filter(recipe=obj, user=request.user).exists()
 
+    def _absolute_url(self, url):
+        request = self.context.get("request")
+        if request and url:
+            return request.build_absolute_uri(url)
+        return url
+
+
+def _render_card(recipe):
+    return RecipeCardSerializer(instance=recipe).data
+
 
 class AddIngredientRecipeSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
@@ -157,6 +312,10 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         if len(ingredient_ids) != len(set(ingredient_ids)):
             raise ValidationError("Уникальность ингредиентов не соблюдена")
 
+        found = Ingredient.objects.filter(pk__in=ingredient_ids).count()
+        if found != len(ingredient_ids):
+            raise ValidationError("Указан несуществующий ингредиент")
+
         return ingredients
 
     def validate_cooking_time(self, value):
@@ -164,22 +323,62 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             raise ValidationError("Неверно указано время приготовления")
         return value
 
-    def __add_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            ingredient_id = ingredient["id"]
-            amount = ingredient["amount"]
-            if RecipeIngredient.objects.filter(
-                recipe=recipe,
-                ingredient=ingredient_id,
-            ).exists():
-                amount += F("amount")
-
-            RecipeIngredient.objects.update_or_create(
-                recipe=recipe,
-                ingredient=ingredient_id,
-                defaults={"amount": amount},
+    def __set_ingredients(self, ingredients, recipe):
+        """Bring the recipe's ingredient rows in line with ``ingredients``.
+
+        Only rows that were removed, added or changed are written: one
+        delete, one ``bulk_create`` and one ``bulk_update`` at most. None of
+        them send per-row signals, so the shopping lists of users carting
+        the recipe get a single delta update instead.
+        """
+        amounts = {
+            ingredient["id"]: ingredient["amount"]
+            for ingredient in ingredients
+        }
+        existing = {row.ingredient_id: row for row in recipe.recipes.all()}
+
+        removed = [row for key, row in existing.items() if key not in amounts]
+        added = [
+            RecipeIngredient(recipe=recipe, ingredient_id=key, amount=amount)
+            for key, amount in amounts.items()
+            if key not in existing
+        ]
+        changed = [
+            row
+            for key, row in existing.items()
+            if key in amounts and row.amount != amounts[key]
+        ]
+
+        deltas = {row.ingredient_id: -row.amount for row in removed}
+        deltas.update({row.ingredient_id: row.amount for row in added})
+        for row in changed:
+            deltas[row.ingredient_id] = amounts[row.ingredient_id] - row.amount
+            row.amount = amounts[row.ingredient_id]
+
+        if removed:
+            # Not .delete(): its post_delete receivers would update the
+            # shopping lists and counters row by row on top of the batched
+            # updates below. Nothing cascades from RecipeIngredient.
+            stale = RecipeIngredient.objects.filter(
+                pk__in=[row.pk for row in removed]
             )
+            stale._raw_delete(stale.db)
+        if added:
+            RecipeIngredient.objects.bulk_create(added)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ["amount"])
+        shopping.change_recipe_ingredients(recipe.id, deltas)
+        counters.shift(
+            Ingredient,
+            "recipes_count",
+            [row.ingredient_id for row in removed],
+            -1,
+        )
+        counters.shift(
+            Ingredient, "recipes_count", [row.ingredient_id for row in added]
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context.get("request").user
         tags_data = validated_data.pop("tags")
@@ -188,16 +387,30 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(
             image=image, author=author, **validated_data
         )
-        self.__add_ingredients(ingredients_data, recipe)
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient_id=ingredient["id"],
+                amount=ingredient["amount"],
+            )
+            for ingredient in ingredients_data
+        )
+        counters.shift(
+            Ingredient,
+            "recipes_count",
+            [ingredient["id"] for ingredient in ingredients_data],
+        )
         recipe.tags.set(tags_data)
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
-        ingredients = validated_data.pop("ingredients")
-        tags = validated_data.pop("tags")
-        RecipeIngredient.objects.filter(recipe=recipe).delete()
-        self.__add_ingredients(ingredients, recipe)
-        recipe.tags.set(tags)
+        ingredients = validated_data.pop("ingredients", None)
+        tags = validated_data.pop("tags", None)
+        if ingredients is not None:
+            self.__set_ingredients(ingredients, recipe)
+        if tags is not None:
+            recipe.tags.set(tags)
         return super().update(recipe, validated_data)
 
     def to_representation(self, recipe):
@@ -208,6 +421,27 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         return data
 
 
+class MultipartRecipeSerializer(AddRecipeSerializer):
+    """Variant of ``AddRecipeSerializer`` for multipart uploads.
+
+    The image arrives as an already spooled file, so it is verified by
+    ``verify_image`` instead of being decoded from base64.
+    """
+
+    image = serializers.FileField()
+
+    def validate_image(self, image):
+        return verify_image(image)
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=100,
+    )
+
+
 class ShowFavoriteRecipeShopListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
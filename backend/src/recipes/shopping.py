@@ -0,0 +1,123 @@
+"""Incremental maintenance of the per-user shopping list aggregate.
+
+``ShoppingListIngredient`` holds, for every user, the total amount of each
+ingredient over the recipes in their cart. Instead of re-aggregating
+``RecipeIngredient`` through ``Busket`` on every download, the rows are
+adjusted by deltas when the cart or a carted recipe changes. Upserts go
+through ``ON CONFLICT`` so concurrent changes for one user stay consistent.
+"""
+
+from django.db import connection
+
+from .models import Busket, RecipeIngredient, ShoppingListIngredient
+
+SHOPPING_LIST = ShoppingListIngredient._meta.db_table
+BUSKET = Busket._meta.db_table
+RECIPE_INGREDIENT = RecipeIngredient._meta.db_table
+
+UPSERT = f"""
+    ON CONFLICT (user_id, ingredient_id)
+    DO UPDATE SET amount = {SHOPPING_LIST}.amount + EXCLUDED.amount
+"""
+
+CHANGE_CART_SQL = f"""
+    INSERT INTO {SHOPPING_LIST} (user_id, ingredient_id, amount)
+    SELECT %s, ingredient_id, SUM(amount) * %s
+    FROM {RECIPE_INGREDIENT}
+    WHERE recipe_id = ANY(%s)
+    GROUP BY ingredient_id
+    {UPSERT}
+"""
+
+CHANGE_RECIPE_SQL = f"""
+    INSERT INTO {SHOPPING_LIST} (user_id, ingredient_id, amount)
+    SELECT cart.user_id, delta.ingredient_id, delta.amount
+    FROM {BUSKET} AS cart,
+        unnest(%s::integer[], %s::integer[]) AS delta(ingredient_id, amount)
+    WHERE cart.recipe_id = %s
+    {UPSERT}
+"""
+
+DELETE_EMPTY_SQL = f"""
+    DELETE FROM {SHOPPING_LIST} WHERE user_id = ANY(%s) AND amount <= 0
+"""
+
+DELETE_EMPTY_FOR_RECIPE_SQL = f"""
+    DELETE FROM {SHOPPING_LIST}
+    WHERE amount <= 0
+        AND user_id IN (SELECT user_id FROM {BUSKET} WHERE recipe_id = %s)
+"""
+
+GROUND_TRUTH_SQL = f"""
+    SELECT cart.user_id, item.ingredient_id, SUM(item.amount) AS amount
+    FROM {BUSKET} AS cart
+    JOIN {RECIPE_INGREDIENT} AS item ON item.recipe_id = cart.recipe_id
+    GROUP BY cart.user_id, item.ingredient_id
+"""
+
+MISMATCHES_SQL = f"""
+    SELECT
+        COALESCE(truth.user_id, list.user_id),
+        COALESCE(truth.ingredient_id, list.ingredient_id),
+        truth.amount,
+        list.amount
+    FROM ({GROUND_TRUTH_SQL}) AS truth
+    FULL OUTER JOIN {SHOPPING_LIST} AS list
+        ON list.user_id = truth.user_id
+        AND list.ingredient_id = truth.ingredient_id
+    WHERE truth.amount IS DISTINCT FROM list.amount
+"""
+
+REBUILD_SQL = f"""
+    INSERT INTO {SHOPPING_LIST} (user_id, ingredient_id, amount)
+    SELECT * FROM ({GROUND_TRUTH_SQL}) AS truth
+    WHERE truth.user_id = ANY(%s)
+"""
+
+
+def add_to_cart(user_id, recipe_ids):
+    _change_cart(user_id, recipe_ids, 1)
+
+
+def remove_from_cart(user_id, recipe_ids):
+    _change_cart(user_id, recipe_ids, -1)
+
+
+def change_recipe_ingredients(recipe_id, deltas):
+    """Apply ``{ingredient_id: amount delta}`` to everyone carting the recipe."""
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            CHANGE_RECIPE_SQL,
+            [list(deltas), list(deltas.values()), recipe_id],
+        )
+        if any(value < 0 for value in deltas.values()):
+            cursor.execute(DELETE_EMPTY_FOR_RECIPE_SQL, [recipe_id])
+
+
+def find_mismatches():
+    """Return ``(user_id, ingredient_id, expected, stored)`` rows that differ."""
+    with connection.cursor() as cursor:
+        cursor.execute(MISMATCHES_SQL)
+        return cursor.fetchall()
+
+
+def rebuild(user_ids):
+    user_ids = list(user_ids)
+    ShoppingListIngredient.objects.filter(user_id__in=user_ids).delete()
+    with connection.cursor() as cursor:
+        cursor.execute(REBUILD_SQL, [user_ids])
+
+
+def _change_cart(user_id, recipe_ids, sign):
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute(CHANGE_CART_SQL, [user_id, sign, recipe_ids])
+        if sign < 0:
+            cursor.execute(DELETE_EMPTY_SQL, [[user_id]])
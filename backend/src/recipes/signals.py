@@ -0,0 +1,251 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from main.conditional import bump_versions, user_scope
+from users.models import AuthorStats, Follow
+
+from . import counters, feed, shopping
+from .memberships import COUNTER_FIELDS
+from .autocomplete import invalidate_ingredient_index
+from .cache import invalidate_recipe_cards
+from .images import schedule_cleanup, schedule_variants
+from .models import (
+    Busket,
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Tag,
+)
+
+User = get_user_model()
+
+_touched = threading.local()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe(sender, instance, **kwargs):
+    invalidate_recipe_cards([instance.pk])
+    bump_versions("recipes")
+
+
+@receiver(post_save, sender=Recipe)
+def build_image_variants(sender, instance, **kwargs):
+    if (
+        instance.image
+        and instance.image.name != instance.image_variants_source
+    ):
+        schedule_variants(instance.pk)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_image_variants(sender, instance, **kwargs):
+    schedule_cleanup(instance.image_variants_source)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def invalidate_recipe_ingredient(sender, instance, **kwargs):
+    touch_recipes([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if not reverse:
+        if action.startswith("post_"):
+            touch_recipes([instance.pk])
+    elif action == "pre_clear":
+        touch_recipes(list(instance.recipes.values_list("id", flat=True)))
+    elif action in ("post_add", "post_remove"):
+        touch_recipes(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    bump_versions("tags")
+    invalidate_recipe_cards(
+        Recipe.objects.filter(tags=instance).values_list("id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def bump_ingredients_version(sender, instance, **kwargs):
+    bump_versions("ingredients")
+
+
+@receiver(post_save, sender=Ingredient)
+def invalidate_ingredient(sender, instance, created, **kwargs):
+    if created:
+        return
+    invalidate_recipe_cards(
+        RecipeIngredient.objects.filter(ingredient=instance).values_list(
+            "recipe_id", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def refresh_ingredient_index(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_ingredient_index)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender, instance, created, **kwargs):
+    if created or not getattr(instance, "public_profile_changed", False):
+        return
+    invalidate_recipe_cards(instance.recipes.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_save, sender=Busket)
+@receiver(post_delete, sender=Busket)
+def bump_user_version(sender, instance, **kwargs):
+    bump_versions(user_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Busket)
+def add_to_shopping_list(sender, instance, created, **kwargs):
+    if created:
+        shopping.add_to_cart(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=Busket)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    shopping.remove_from_cart(instance.user_id, [instance.recipe_id])
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_recipe_ingredient(sender, instance, **kwargs):
+    instance.previous_state = (
+        RecipeIngredient.objects.filter(pk=instance.pk)
+        .values_list("ingredient_id", "amount")
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def update_shopping_lists(sender, instance, **kwargs):
+    amount = instance.amount
+    if not isinstance(amount, int):
+        instance.refresh_from_db(fields=["amount"])
+        amount = instance.amount
+
+    deltas = {instance.ingredient_id: amount}
+    if instance.previous_state:
+        ingredient_id, previous_amount = instance.previous_state
+        deltas[ingredient_id] = deltas.get(ingredient_id, 0) - previous_amount
+    shopping.change_recipe_ingredients(instance.recipe_id, deltas)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def shrink_shopping_lists(sender, instance, **kwargs):
+    shopping.change_recipe_ingredients(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=Busket)
+def count_recipe_added(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(Recipe, COUNTER_FIELDS[sender], [instance.recipe_id])
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=Busket)
+def count_recipe_removed(sender, instance, **kwargs):
+    counters.shift(Recipe, COUNTER_FIELDS[sender], [instance.recipe_id], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def count_author_recipe(sender, instance, created, **kwargs):
+    if created:
+        counters.shift(AuthorStats, "recipes_count", [instance.author_id])
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_author_recipe(sender, instance, **kwargs):
+    counters.shift(AuthorStats, "recipes_count", [instance.author_id], -1)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def count_ingredient_usage(sender, instance, created, **kwargs):
+    previous_state = getattr(instance, "previous_state", None)
+    if previous_state and previous_state[0] != instance.ingredient_id:
+        counters.shift(Ingredient, "recipes_count", [previous_state[0]], -1)
+    elif not created:
+        return
+    counters.shift(Ingredient, "recipes_count", [instance.ingredient_id])
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def uncount_ingredient_usage(sender, instance, **kwargs):
+    counters.shift(Ingredient, "recipes_count", [instance.ingredient_id], -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        feed.schedule_fan_out(instance.pk, instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        feed.backfill(instance.follower_id, instance.author_id)
+
+
+@receiver(pre_delete, sender=Follow)
+def refill_timelines(sender, instance, **kwargs):
+    feed.schedule_refill(instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def drop_from_timeline(sender, instance, **kwargs):
+    feed.drop(instance.follower_id, instance.author_id)
+
+
+def touch_recipes(recipe_ids):
+    """Mark recipes as modified after a change to their related rows.
+
+    Recipes touched in a transaction are collected and written when it
+    commits, so saving every ingredient row of a recipe costs one
+    ``UPDATE`` and one version bump. Ids left over by a rolled back
+    transaction are only touched needlessly with the next commit.
+    """
+    pending = getattr(_touched, "recipe_ids", None)
+    if pending is None:
+        pending = _touched.recipe_ids = set()
+    pending.update(recipe_ids)
+    transaction.on_commit(_flush_touched_recipes)
+
+
+def _flush_touched_recipes():
+    recipe_ids = getattr(_touched, "recipe_ids", None)
+    if not recipe_ids:
+        return
+
+    _touched.recipe_ids = set()
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    invalidate_recipe_cards(recipe_ids)
+    bump_versions("recipes")
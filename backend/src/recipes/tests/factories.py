@@ -0,0 +1,68 @@
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+TEST_IMAGE = "recipes/test.png"
+
+
+def make_user(username, **fields):
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="password",
+        **fields,
+    )
+
+
+def token_header(user):
+    token, _ = Token.objects.get_or_create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token.key}"}
+
+
+def make_tags(amount):
+    return [
+        Tag.objects.create(
+            name=f"Тег {number}", slug=f"tag-{number}", color=f"{number:06X}"
+        )
+        for number in range(amount)
+    ]
+
+
+def make_ingredients(amount):
+    return Ingredient.objects.bulk_create(
+        Ingredient(name=f"Ингредиент {number}", unit="г")
+        for number in range(amount)
+    )
+
+
+def test_image():
+    """Return the name of a stored PNG shared by the test recipes."""
+    if not default_storage.exists(TEST_IMAGE):
+        buffer = BytesIO()
+        Image.new("RGB", (32, 32), "orange").save(buffer, format="PNG")
+        default_storage.save(TEST_IMAGE, ContentFile(buffer.getvalue()))
+    return TEST_IMAGE
+
+
+def make_recipe(author, name="Рецепт", tags=(), ingredients=()):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=name,
+        text="Описание",
+        cooking_time=10,
+        image=test_image(),
+    )
+    recipe.tags.set(tags)
+    for ingredient in ingredients:
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=ingredient, amount=2
+        )
+    return recipe
@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from recipes.autocomplete import reset_index
+from recipes.models import Ingredient
+
+INGREDIENTS_URL = "/api/ingredients/"
+
+
+@override_settings(INGREDIENT_AUTOCOMPLETE_LIMIT=2)
+class IngredientAutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, unit="г")
+            for name in (
+                "зюзяблик",
+                "зюзяблик сушеный",
+                "малый зюзяблик",
+                "соль",
+            )
+        )
+
+    def setUp(self):
+        cache.clear()
+        reset_index()
+        self.addCleanup(reset_index)
+
+    def names(self, **params):
+        response = self.client.get(INGREDIENTS_URL, params)
+        self.assertEqual(response.status_code, 200)
+        return [ingredient["name"] for ingredient in response.data]
+
+    def test_name_filter_is_unchanged(self):
+        self.assertCountEqual(
+            self.names(name="зюзяблик"),
+            ["зюзяблик", "зюзяблик сушеный", "малый зюзяблик"],
+        )
+
+    def test_autocomplete_is_opt_in(self):
+        self.assertEqual(
+            self.names(name="зюзяблик", autocomplete="true"),
+            ["зюзяблик", "зюзяблик сушеный"],
+        )
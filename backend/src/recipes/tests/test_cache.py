@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.cache import RECIPE_CARD_KEY, get_recipe_cards
+from recipes.models import Recipe
+from recipes.serializers import RecipeCardSerializer
+from recipes.tests.factories import make_recipe, make_user
+
+REPLICA = "replica"
+
+
+def render(recipe):
+    return RecipeCardSerializer(instance=recipe).data
+
+
+class RecipeCardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.recipe = make_recipe(make_user("author"), name="Новое")
+
+    def replica_copy(self, name):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        recipe.name = name
+        recipe._state.db = REPLICA
+        return recipe
+
+    def test_card_is_rendered_from_primary(self):
+        [card] = get_recipe_cards([self.replica_copy("Старое")], render)
+
+        self.assertEqual(card["name"], "Новое")
+        cached = cache.get(RECIPE_CARD_KEY.format(self.recipe.pk))
+        self.assertEqual(cached["name"], "Новое")
+
+    def test_recipe_gone_from_primary_is_not_cached(self):
+        stale = self.replica_copy("Старое")
+        Recipe.objects.filter(pk=self.recipe.pk).delete()
+
+        [card] = get_recipe_cards([stale], render)
+
+        self.assertEqual(card["name"], "Старое")
+        self.assertIsNone(cache.get(RECIPE_CARD_KEY.format(stale.pk)))
@@ -0,0 +1,138 @@
+from django.test import TransactionTestCase, override_settings
+
+from recipes.feed import feed_for
+from recipes.models import Recipe, TimelineEntry
+from recipes.tests.factories import make_recipe, make_user, token_header
+from users.models import Follow
+
+FEED_URL = "/api/recipes/feed/"
+
+
+def timeline(user):
+    return list(
+        TimelineEntry.objects.filter(user=user)
+        .order_by("-recipe_id")
+        .values_list("recipe_id", flat=True)
+    )
+
+
+@override_settings(
+    FEED_FANOUT_ASYNC=False,
+    FEED_FANOUT_BATCH_SIZE=1,
+    FEED_TIMELINE_SIZE=2,
+    RECIPE_IMAGE_VARIANTS_ASYNC=False,
+)
+class FanOutTests(TransactionTestCase):
+    def setUp(self):
+        self.author = make_user("author")
+        self.reader = make_user("reader")
+        self.other = make_user("other")
+        Follow.objects.create(follower=self.reader, author=self.author)
+        Follow.objects.create(follower=self.other, author=self.author)
+
+    def test_recipe_reaches_every_follower(self):
+        recipe = make_recipe(self.author)
+
+        self.assertEqual(timeline(self.reader), [recipe.pk])
+        self.assertEqual(timeline(self.other), [recipe.pk])
+        self.assertEqual(timeline(self.author), [])
+
+    def test_timeline_is_trimmed_to_its_size(self):
+        recipes = [
+            make_recipe(self.author, name=f"Рецепт {number}")
+            for number in range(3)
+        ]
+
+        newest = [recipe.pk for recipe in reversed(recipes[1:])]
+        self.assertEqual(timeline(self.reader), newest)
+        self.assertEqual(timeline(self.other), newest)
+
+    def test_new_follower_gets_latest_recipes(self):
+        recipes = [
+            make_recipe(self.author, name=f"Рецепт {number}")
+            for number in range(3)
+        ]
+        newcomer = make_user("newcomer")
+
+        Follow.objects.create(follower=newcomer, author=self.author)
+
+        newest = [recipe.pk for recipe in reversed(recipes[1:])]
+        self.assertEqual(timeline(newcomer), newest)
+
+    def test_unfollow_drops_author_recipes(self):
+        make_recipe(self.author)
+
+        Follow.objects.filter(follower=self.reader).delete()
+
+        self.assertEqual(timeline(self.reader), [])
+        self.assertEqual(len(timeline(self.other)), 1)
+
+    def test_deleted_recipe_leaves_timelines(self):
+        kept = make_recipe(self.author, name="Оставшийся")
+        make_recipe(self.author, name="Удаленный").delete()
+
+        self.assertEqual(timeline(self.reader), [kept.pk])
+        self.assertEqual(timeline(self.other), [kept.pk])
+
+
+@override_settings(FEED_FANOUT_ASYNC=False, RECIPE_IMAGE_VARIANTS_ASYNC=False)
+class FeedEndpointTests(TransactionTestCase):
+    def setUp(self):
+        self.author = make_user("author")
+        self.stranger = make_user("stranger")
+        self.reader = make_user("reader")
+        Follow.objects.create(follower=self.reader, author=self.author)
+        self.recipes = [
+            make_recipe(self.author, name=f"Рецепт {number}")
+            for number in range(3)
+        ]
+        make_recipe(self.stranger, name="Чужой")
+
+    def test_pages_through_followed_recipes(self):
+        response = self.client.get(
+            FEED_URL, {"limit": 2}, **token_header(self.reader)
+        )
+        self.assertEqual(response.status_code, 200)
+        first = [recipe["id"] for recipe in response.data["results"]]
+        self.assertIsNone(response.data["previous"])
+
+        response = self.client.get(
+            response.data["next"], **token_header(self.reader)
+        )
+        self.assertEqual(response.status_code, 200)
+        second = [recipe["id"] for recipe in response.data["results"]]
+        self.assertIsNone(response.data["next"])
+
+        expected = [recipe.pk for recipe in reversed(self.recipes)]
+        self.assertEqual(first + second, expected)
+
+    def test_requires_authentication(self):
+        response = self.client.get(FEED_URL)
+
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(
+    FEED_FANOUT_ASYNC=False,
+    FEED_FANOUT_MAX_FOLLOWERS=1,
+    RECIPE_IMAGE_VARIANTS_ASYNC=False,
+)
+class FanOutThresholdTests(TransactionTestCase):
+    def setUp(self):
+        self.author = make_user("author")
+        self.reader = make_user("reader")
+        self.other = make_user("other")
+        Follow.objects.create(follower=self.reader, author=self.author)
+        Follow.objects.create(follower=self.other, author=self.author)
+
+    def feed(self, user):
+        return list(feed_for(Recipe.objects.all(), user))
+
+    def test_pulled_recipes_stay_after_switch_to_fan_out(self):
+        pulled = make_recipe(self.author, name="Втянутый")
+        self.assertEqual(self.feed(self.reader), [pulled])
+
+        Follow.objects.filter(follower=self.other).delete()
+        pushed = make_recipe(self.author, name="Разосланный")
+
+        self.assertEqual(self.feed(self.reader), [pushed, pulled])
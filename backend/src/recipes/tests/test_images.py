@@ -0,0 +1,82 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from recipes.images import FORMATS, VARIANTS, variant_name
+from recipes.models import Recipe
+from recipes.tests.factories import make_user
+
+
+def png(color):
+    buffer = BytesIO()
+    Image.new("RGB", (32, 32), color).save(buffer, format="PNG")
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(RECIPE_IMAGE_VARIANTS_ASYNC=False)
+class ImageVariantCleanupTests(TransactionTestCase):
+    """Variants are built and deleted right after commit, in the test."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = make_user("author")
+
+    def make_recipe(self, color=None, **fields):
+        recipe = Recipe(
+            author=self.author,
+            name="Рецепт",
+            text="Описание",
+            cooking_time=10,
+            **fields,
+        )
+        if color is not None:
+            recipe.image.save(f"{color}.png", png(color), save=False)
+        recipe.save()
+        recipe.refresh_from_db()
+        return recipe
+
+    def assertVariants(self, source_name, exist):
+        for variant in VARIANTS:
+            for extension in FORMATS:
+                name = variant_name(source_name, variant, extension)
+                self.assertIs(default_storage.exists(name), exist, name)
+
+    def test_replaced_image_variants_are_deleted(self):
+        recipe = self.make_recipe("red")
+        old_source = recipe.image_variants_source
+        self.assertVariants(old_source, exist=True)
+
+        recipe.image.save("blue.png", png("blue"))
+        recipe.refresh_from_db()
+
+        self.assertEqual(recipe.image_variants_source, recipe.image.name)
+        self.assertVariants(recipe.image.name, exist=True)
+        self.assertVariants(old_source, exist=False)
+
+    def test_deleted_recipe_variants_are_deleted(self):
+        recipe = self.make_recipe("red")
+        source = recipe.image_variants_source
+
+        recipe.delete()
+
+        self.assertVariants(source, exist=False)
+
+    def test_shared_image_variants_are_kept(self):
+        recipe = self.make_recipe("red")
+        self.make_recipe(
+            image=recipe.image.name,
+            image_variants_source=recipe.image.name,
+        )
+
+        recipe.delete()
+
+        self.assertVariants(recipe.image.name, exist=True)
@@ -0,0 +1,151 @@
+import json
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from PIL import Image
+
+from recipes.models import Recipe
+from recipes.tests.factories import (
+    make_ingredients,
+    make_recipe,
+    make_tags,
+    make_user,
+    token_header,
+)
+
+CREATE_URL = "/api/recipes/multipart/"
+
+
+def png_file(name="photo.png"):
+    buffer = BytesIO()
+    Image.new("RGB", (32, 32), "red").save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), "image/png")
+
+
+class MultipartUpdateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user("author")
+        cls.tags = make_tags(2)
+        cls.ingredients = make_ingredients(3)
+        cls.recipe = make_recipe(
+            cls.author, tags=cls.tags, ingredients=cls.ingredients
+        )
+        cls.url = f"/api/recipes/{cls.recipe.pk}/multipart/"
+
+    def patch(self, body, **extra):
+        return self.client.patch(
+            self.url,
+            body,
+            content_type=MULTIPART_CONTENT,
+            **token_header(self.author),
+            **extra,
+        )
+
+    def test_partial_update_keeps_relations_not_sent(self):
+        body = encode_multipart(
+            BOUNDARY, {"recipe": json.dumps({"name": "Новое название"})}
+        )
+
+        response = self.patch(body)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, "Новое название")
+        self.assertCountEqual(self.recipe.tags.all(), self.tags)
+        self.assertCountEqual(self.recipe.ingredients.all(), self.ingredients)
+
+    def test_partial_update_rewrites_relations_sent(self):
+        body = encode_multipart(
+            BOUNDARY,
+            {
+                "recipe": json.dumps(
+                    {
+                        "ingredients": [
+                            {"id": self.ingredients[0].pk, "amount": 5}
+                        ]
+                    }
+                )
+            },
+        )
+
+        response = self.patch(body)
+
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            list(self.recipe.recipes.values_list("ingredient_id", "amount")),
+            [(self.ingredients[0].pk, 5)],
+        )
+        self.assertCountEqual(self.recipe.tags.all(), self.tags)
+
+    def test_malformed_content_length(self):
+        body = encode_multipart(BOUNDARY, {"recipe": "{}"})
+
+        response = self.patch(body, CONTENT_LENGTH="many")
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(RECIPE_IMAGE_VARIANTS_ASYNC=False)
+class MultipartCreateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user("author")
+        cls.tags = make_tags(1)
+        cls.ingredients = make_ingredients(2)
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def post(self, image):
+        recipe = {
+            "name": "Рецепт с фото",
+            "text": "Описание",
+            "cooking_time": 15,
+            "tags": [self.tags[0].pk],
+            "ingredients": [
+                {"id": ingredient.pk, "amount": 3}
+                for ingredient in self.ingredients
+            ],
+        }
+        return self.client.post(
+            CREATE_URL,
+            {"recipe": json.dumps(recipe), "image": image},
+            **token_header(self.author),
+        )
+
+    def test_create(self):
+        response = self.post(png_file())
+
+        self.assertEqual(response.status_code, 201, response.data)
+        recipe = Recipe.objects.get(pk=response.data["id"])
+        self.assertEqual(recipe.author, self.author)
+        self.assertTrue(recipe.image.name.endswith(".png"))
+        self.assertCountEqual(recipe.ingredients.all(), self.ingredients)
+
+    def test_oversized_image(self):
+        image = png_file()
+        # Small enough to pass the Content-Length check, so the streaming
+        # handler is what stops the upload.
+        with override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=image.size - 1):
+            response = self.post(image)
+
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_not_an_image(self):
+        text = SimpleUploadedFile("photo.png", b"not an image", "image/png")
+
+        response = self.post(text)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("image", response.data)
+        self.assertFalse(Recipe.objects.exists())
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.tokens import AccessToken
+
+from recipes.permissions import IsAdminOrReadOnly, IsAuthorOrAdmin
+from recipes.tests.factories import make_recipe, make_user
+from users.authentication import (
+    RoleJWTAuthentication,
+    RoleTokenAuthentication,
+    issue_tokens,
+)
+from users.models import UserRole
+
+
+class PermissionQueryTests(TestCase):
+    """Role checks read the role loaded during authentication."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = make_user("author")
+        cls.recipe = make_recipe(cls.author)
+        cls.users = {"author": cls.author}
+        for role in (UserRole.ADMIN, UserRole.MODERATOR):
+            user = make_user(role)
+            user.userrole.role = role
+            user.userrole.save()
+            cls.users[role] = user
+
+    def authenticate_with_token(self, user):
+        key = Token.objects.create(user=user).key
+        user, _ = RoleTokenAuthentication().authenticate_credentials(key)
+        return user
+
+    def authenticate_with_jwt(self, user):
+        user.refresh_from_db()
+        token = AccessToken(issue_tokens(user)["access"])
+        return RoleJWTAuthentication().get_user(token)
+
+    def check_permissions(self, user):
+        request = SimpleNamespace(method="PATCH", user=user)
+        return (
+            IsAuthorOrAdmin().has_object_permission(
+                request, None, self.recipe
+            ),
+            IsAdminOrReadOnly().has_permission(request, None),
+        )
+
+    def test_no_queries(self):
+        expected = {
+            "author": (True, False),
+            UserRole.ADMIN: (True, True),
+            UserRole.MODERATOR: (False, False),
+        }
+        for authenticate in (
+            self.authenticate_with_token,
+            self.authenticate_with_jwt,
+        ):
+            for name, user in self.users.items():
+                with self.subTest(authenticate.__name__, user=name):
+                    user = authenticate(user)
+                    with self.assertNumQueries(0):
+                        allowed = self.check_permissions(user)
+                    self.assertEqual(allowed, expected[name])
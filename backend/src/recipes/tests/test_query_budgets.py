@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+from importlib import import_module
+
+from django.apps import apps
+from django.test import TransactionTestCase, override_settings
+
+from recipes import benchmark, query_budgets
+from recipes.models import Ingredient
+
+load_ingredients = import_module(
+    "recipes.migrations.0002_load_ingedients"
+).load_ingredients
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class QueryBudgetTests(TransactionTestCase):
+    """Every API route stays within the budget of ``query_budgets.json``.
+
+    Seeding commits in chunks, so the test can't run in a transaction.
+    Other transactional tests flush the ingredients loaded by the
+    migrations, so they are loaded again with the sequences reset, as in
+    the fresh database of ``manage.py check_query_budgets --update``.
+    """
+
+    reset_sequences = True
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        if not Ingredient.objects.exists():
+            load_ingredients(apps, None)
+        benchmark.seed(query_budgets.DATASET_RECIPES)
+
+    def test_routes_within_budget(self):
+        measurements, _ = query_budgets.measure_all()
+
+        failures = query_budgets.check(
+            measurements, query_budgets.load_baseline()
+        )
+
+        self.assertEqual(failures, [], "\n".join(failures))
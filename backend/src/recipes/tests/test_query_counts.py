@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.tests.factories import (
+    make_ingredients,
+    make_recipe,
+    make_tags,
+    make_user,
+    token_header,
+)
+
+RECIPES_URL = "/api/recipes/"
+
+
+class RecipeQueryCountTests(TestCase):
+    """Recipe pages cost the same number of queries whatever their size.
+
+    The cache is cleared before each request, so the counts cover the cold
+    path: recipe cards rendered from the database in bulk.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = make_user("reader")
+        authors = [make_user(f"author{number}") for number in range(3)]
+        tags = make_tags(3)
+        ingredients = make_ingredients(8)
+        cls.recipes = [
+            make_recipe(
+                authors[number % 3],
+                name=f"Рецепт {number}",
+                tags=tags[: number % 3 + 1],
+                ingredients=ingredients[: number % 8 + 1],
+            )
+            for number in range(12)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def get_list(self, limit, num_queries, **headers):
+        cache.clear()
+        with self.assertNumQueries(num_queries):
+            response = self.client.get(
+                RECIPES_URL, {"limit": limit}, **headers
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), limit)
+        return response
+
+    def get_detail(self, recipe, num_queries, **headers):
+        cache.clear()
+        with self.assertNumQueries(num_queries):
+            response = self.client.get(f"{RECIPES_URL}{recipe.pk}/", **headers)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_anonymous_list(self):
+        # COUNT, page, authors, tags, ingredients.
+        for limit in (2, 10):
+            with self.subTest(limit=limit):
+                self.get_list(limit, 5)
+
+    def test_authenticated_list(self):
+        # Token, the five above, favorites, cart and follows of the user.
+        for limit in (2, 10):
+            with self.subTest(limit=limit):
+                self.get_list(limit, 9, **token_header(self.reader))
+
+    def test_cached_list(self):
+        headers = token_header(self.reader)
+        self.get_list(10, 9, **headers)
+        with self.assertNumQueries(1):
+            self.client.get(RECIPES_URL, {"limit": 10}, **headers)
+
+    def test_anonymous_detail(self):
+        # Validators, recipe, author, tags, ingredients.
+        for recipe in (self.recipes[0], self.recipes[7]):
+            with self.subTest(ingredients=recipe.recipes.count()):
+                self.get_detail(recipe, 5)
+
+    def test_authenticated_detail(self):
+        for recipe in (self.recipes[0], self.recipes[7]):
+            with self.subTest(ingredients=recipe.recipes.count()):
+                self.get_detail(recipe, 6, **token_header(self.reader))
@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from recipes.models import Recipe
+from recipes.tests.factories import make_user
+
+RECIPES_URL = "/api/recipes/"
+
+
+class RecipeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = make_user("author")
+        cls.in_name = Recipe.objects.create(
+            author=author,
+            name="Суп с тыквой",
+            text="Описание",
+            cooking_time=10,
+            image="recipes/test.png",
+        )
+        cls.in_text = Recipe.objects.create(
+            author=author,
+            name="Обед",
+            text="Суп из тыквы со сливками",
+            cooking_time=10,
+            image="recipes/test.png",
+        )
+
+    def test_ranked_by_relevance(self):
+        response = self.client.get(RECIPES_URL, {"search": "тыква"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.data["results"]],
+            [self.in_name.pk, self.in_text.pk],
+        )
+
+    def test_cursor_pagination_refused(self):
+        response = self.client.get(
+            RECIPES_URL, {"search": "тыква", "pagination": "cursor"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("search", response.data)
@@ -0,0 +1,37 @@
+from django.db import connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Recipe
+from recipes.tests.factories import (
+    make_ingredients,
+    make_recipe,
+    make_tags,
+    make_user,
+)
+
+TOUCH_SQL = 'UPDATE "recipes_recipe" SET "updated_at"'
+
+
+@override_settings(RECIPE_IMAGE_VARIANTS_ASYNC=False)
+class TouchRecipesTests(TransactionTestCase):
+    def test_one_update_per_transaction(self):
+        author = make_user("author")
+        tags = make_tags(3)
+        ingredients = make_ingredients(5)
+
+        with CaptureQueriesContext(connection) as context:
+            with transaction.atomic():
+                recipe = make_recipe(
+                    author, tags=tags, ingredients=ingredients
+                )
+                created_at = recipe.updated_at
+
+        touches = [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith(TOUCH_SQL)
+        ]
+        self.assertEqual(len(touches), 1)
+        recipe = Recipe.objects.get(pk=recipe.pk)
+        self.assertGreater(recipe.updated_at, created_at)
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.core.files.uploadhandler import (
+    FileUploadHandler,
+    StopUpload,
+    TemporaryFileUploadHandler,
+)
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+ALLOWED_IMAGE_FORMATS = ("JPEG", "PNG", "WEBP", "GIF")
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """Abort an upload as soon as a file grows past ``max_size`` bytes.
+
+    Chunks are passed through untouched to the next handler, so the file
+    itself is streamed to disk by ``TemporaryFileUploadHandler``.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+        self.exceeded = False
+        self.received = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.exceeded = True
+            raise StopUpload(connection_reset=False)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def streaming_upload_handlers(request):
+    """Handlers that spool uploads to a temporary file with a size cap."""
+    return [MaxSizeUploadHandler(request), TemporaryFileUploadHandler(request)]
+
+
+def verify_image(uploaded):
+    """Check that the uploaded file is an image of an allowed format.
+
+    ``Image.verify`` only parses the file structure without decoding the
+    pixels, and Pillow refuses images over its decompression bomb limit,
+    so the check is cheap enough to run in the request.
+    """
+    if hasattr(uploaded, "temporary_file_path"):
+        source = uploaded.temporary_file_path()
+    else:
+        source = uploaded
+        source.seek(0)
+
+    try:
+        with Image.open(source) as image:
+            image.verify()
+            image_format = image.format
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError("Загрузите корректное изображение")
+    finally:
+        if not isinstance(source, str):
+            source.seek(0)
+
+    if image_format not in ALLOWED_IMAGE_FORMATS:
+        raise ValidationError("Неподдерживаемый формат изображения")
+    return uploaded
@@ -1,38 +1,128 @@
 import datetime as dt
+import json
 
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db import IntegrityError
-from django.db.models import Sum
 from django.http import HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 
-from main.pagination import LimitPageNumberPaginator
+from main.conditional import ConditionalGetMixin, get_versions, user_scope
+from main.pagination import LimitCursorPaginator, OptInCursorPaginator
+from . import memberships
+from .autocomplete import get_ingredient_index
+from .cache import get_shared_page, get_user_flags
+from .feed import feed_for
 from .filters import IngredientFilter, RecipeFilter
-from .models import Ingredient, Recipe, Tag, RecipeIngredient
+from .models import Busket, FavoriteRecipe, Ingredient, Recipe, Tag
 from .permissions import IsAdminOrReadOnly, IsAuthorOrAdmin
 from .serializers import (
     AddRecipeSerializer,
     AddShowRecipeSerializer,
     IngredientSerializer,
+    MultipartRecipeSerializer,
+    RecipeIdsSerializer,
     RecipeSerializer,
+    ShoppingListIngredientSerializer,
     TagSerializer,
+    overlay_user_flags,
 )
+from .uploads import streaming_upload_handlers
 
+MULTIPART_OVERHEAD = 64 * 1024
+USER_SPECIFIC_FILTERS = ("is_favorited", "is_in_shopping_cart")
 
-class RecipesViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
+
+class RecipesViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Recipe.objects.defer("search_vector")
     serializer_classes = {
         "retrieve": AddShowRecipeSerializer,
         "list": AddShowRecipeSerializer,
+        "feed": AddShowRecipeSerializer,
+        "create_multipart": MultipartRecipeSerializer,
+        "update_multipart": MultipartRecipeSerializer,
     }
     default_serializer_class = AddRecipeSerializer
+    image_variants = {
+        "retrieve": "detail",
+        "list": "card",
+        "feed": "card",
+    }
     permission_classes = (IsAuthorOrAdmin,)
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
-    pagination_class = LimitPageNumberPaginator
+    pagination_class = OptInCursorPaginator
+    use_read_replica = True
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list" and self.uses_shared_pages():
+            queryset = queryset.with_user_flags(None)
+        elif self.action in ("list", "retrieve", "feed"):
+            queryset = queryset.with_user_flags(self.request.user)
+        return queryset
+
+    def uses_shared_pages(self):
+        return not any(
+            name in self.request.query_params for name in USER_SPECIFIC_FILTERS
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.uses_shared_pages():
+            return super().list(request, *args, **kwargs)
+        return self.conditional_get(self.shared_list, request)
+
+    def shared_list(self, request):
+        """Serve the anonymous page shared by all users plus the user's flags.
+
+        The page is keyed by the URL and the versions it depends on, so
+        every user hits the same cache entry; the flags come from
+        ``get_user_flags``.
+        """
+        versions = get_versions("recipes", "tags", "ingredients", "users")
+        page = get_shared_page(
+            (request.build_absolute_uri(), *versions.values()),
+            self._render_page,
+        )
+        return Response(overlay_user_flags(page, get_user_flags(request.user)))
+
+    def _render_page(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data).data
+
+    def get_cache_validators(self):
+        scopes = ["tags", "ingredients", "users"]
+        if self.request.user.is_authenticated:
+            scopes.append(user_scope(self.request.user.pk))
+
+        if self.action == "retrieve":
+            updated_at = (
+                Recipe.objects.filter(pk=self.kwargs["pk"])
+                .values_list("updated_at", flat=True)
+                .first()
+            )
+            if updated_at is None:
+                return None
+            versions = list(get_versions(*scopes).values())
+            return (
+                (updated_at.isoformat(), *versions),
+                max(updated_at.timestamp(), max(versions) / 1e9),
+            )
+
+        versions = get_versions("recipes", *scopes)
+        return tuple(versions.values()), max(versions.values()) / 1e9
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["image_variant"] = self.image_variants.get(self.action)
+        return context
 
     def get_serializer_class(self):
         return self.serializer_classes.get(
@@ -40,6 +130,137 @@ class RecipesViewSet(viewsets.ModelViewSet):
             self.default_serializer_class,
         )
 
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        methods=["POST"],
+        url_path="multipart",
+        parser_classes=(MultiPartParser,),
+    )
+    def create_multipart(self, request):
+        payload = self._get_multipart_payload(request)
+        if isinstance(payload, Response):
+            return payload
+
+        serializer = self.get_serializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=True,
+        permission_classes=(permissions.IsAuthenticated, IsAuthorOrAdmin),
+        methods=["PUT", "PATCH"],
+        url_path="multipart",
+        parser_classes=(MultiPartParser,),
+    )
+    def update_multipart(self, request, pk=None):
+        recipe = self.get_object()
+        payload = self._get_multipart_payload(request)
+        if isinstance(payload, Response):
+            return payload
+
+        serializer = self.get_serializer(
+            instance=recipe,
+            data=payload,
+            partial=request.method == "PATCH",
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+    def _get_multipart_payload(self, request):
+        """Stream a multipart body to disk and build the serializer input.
+
+        The recipe fields come as a JSON document in the ``recipe`` part and
+        the photo as a regular file in the ``image`` part.
+        """
+        max_size = settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+        too_large = Response(
+            data={"error": f"Размер файла превышает {max_size} байт"},
+            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        )
+        try:
+            content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return Response(
+                data={"error": "Некорректный заголовок Content-Length"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if content_length > max_size + MULTIPART_OVERHEAD:
+            return too_large
+
+        handlers = streaming_upload_handlers(request._request)
+        request._request.upload_handlers = handlers
+        data = request.data
+        if handlers[0].exceeded:
+            return too_large
+
+        try:
+            payload = json.loads(data.get("recipe") or "{}")
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            raise ValidationError({"recipe": "Ожидается JSON-объект рецепта"})
+
+        if "image" in data:
+            payload["image"] = data["image"]
+        return payload
+
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        methods=["POST", "DELETE"],
+        url_path="favorite",
+        url_name="bulk-favorite",
+    )
+    def bulk_favorite(self, request):
+        return self._change_memberships(request, FavoriteRecipe)
+
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        methods=["POST", "DELETE"],
+        url_path="shopping_cart",
+        url_name="bulk-shopping-cart",
+    )
+    def bulk_shopping_cart(self, request):
+        return self._change_memberships(request, Busket)
+
+    def _change_memberships(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data["recipes"]))
+
+        if request.method == "POST":
+            changed = memberships.add_recipes(
+                model, request.user.pk, recipe_ids
+            )
+            outcomes = ("added", "exists")
+        else:
+            changed = memberships.remove_recipes(
+                model, request.user.pk, recipe_ids
+            )
+            outcomes = ("removed", "missing")
+
+        unchanged = set(recipe_ids) - changed
+        found = set(
+            Recipe.objects.filter(pk__in=unchanged).values_list(
+                "id", flat=True
+            )
+        )
+        results = []
+        for recipe_id in recipe_ids:
+            if recipe_id in changed:
+                outcome = outcomes[0]
+            elif recipe_id in found:
+                outcome = outcomes[1]
+            else:
+                outcome = "not_found"
+            results.append({"id": recipe_id, "status": outcome})
+
+        return Response(data={"results": results}, status=status.HTTP_200_OK)
+
     @action(
         detail=True,
         permission_classes=(permissions.IsAuthenticated,),
@@ -117,29 +338,22 @@ class RecipesViewSet(viewsets.ModelViewSet):
         permission_classes=(permissions.IsAuthenticated,),
     )
     def download_shopping_cart(self, request):
-        if not request.user.users_set.exists():
+        ingredients = self._get_shopping_list(request)
+        if not ingredients:
             return Response(
                 data={"error": "Список покупок пуст"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__basket_set__user=request.user
-            )
-            .values("ingredient__name", "ingredient__unit")
-            .annotate(amount=Sum("amount"))
-        )
-
         shopping_list = (
             f"Список покупок для: {request.user.username}\n\n"
             f"Дата: {dt.date.today():%Y-%m-%d}\n\n"
         )
         shopping_list += "\n".join(
             [
-                f'{ingredient["ingredient__name"]}, '
-                f'{ingredient["amount"]} '
-                f'{ingredient["ingredient__unit"]}'
+                f"{ingredient.ingredient.name}, "
+                f"{ingredient.amount} "
+                f"{ingredient.ingredient.unit}"
                 for ingredient in ingredients
             ]
         )
@@ -155,17 +369,82 @@ class RecipesViewSet(viewsets.ModelViewSet):
         response["Content-Disposition"] = f"attachment; filename={filename}"
         return response
 
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+        pagination_class=LimitCursorPaginator,
+    )
+    def feed(self, request):
+        queryset = feed_for(self.get_queryset(), request.user)
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated,),
+    )
+    def shopping_list(self, request):
+        serializer = ShoppingListIngredientSerializer(
+            instance=self._get_shopping_list(request),
+            many=True,
+        )
+        return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+    def _get_shopping_list(self, request):
+        return list(
+            request.user.shopping_list.select_related("ingredient").order_by(
+                "ingredient__name"
+            )
+        )
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
     permission_classes = (IsAdminOrReadOnly,)
+    use_read_replica = True
+
+    def get_cache_validators(self):
+        version = get_versions("tags")["tags"]
+        return (version,), version / 1e9
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
+    use_read_replica = True
+
+    def get_cache_validators(self):
+        version = get_versions("ingredients")["ingredients"]
+        return (version,), version / 1e9
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get("name")
+        if not name or not self.wants_autocomplete(request):
+            return super().list(request, *args, **kwargs)
+        return self.conditional_get(self.autocomplete, request, name)
+
+    def wants_autocomplete(self, request):
+        """Clients opt in with ``?autocomplete=true``.
+
+        Autocomplete caps the results and mixes in fuzzy matches, so plain
+        ``?name=`` keeps returning every ingredient containing the name.
+        """
+        return (
+            settings.INGREDIENT_AUTOCOMPLETE_ENABLED
+            and request.query_params.get("autocomplete") in ("1", "true")
+        )
+
+    def autocomplete(self, request, name):
+        try:
+            limit = int(request.query_params["limit"])
+        except (KeyError, ValueError):
+            limit = settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        limit = min(max(limit, 1), settings.INGREDIENT_AUTOCOMPLETE_MAX_LIMIT)
+
+        return Response(data=get_ingredient_index().search(name, limit))
@@ -1,7 +1,7 @@
 from django.conf import settings
 from django.contrib import admin
 
-from .models import Follow, UserRole
+from .models import AuthorStats, Follow, UserRole
 
 
 @admin.register(UserRole)
@@ -18,3 +18,10 @@ class FollowAdmin(admin.ModelAdmin):
     list_filter = ("follower", "author")
     search_fields = ("author",)
     empty_value_display = settings.EMPTY_VALUE
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = ("user", "recipes_count", "followers_count")
+    search_fields = ("user__username",)
+    readonly_fields = ("recipes_count", "followers_count")
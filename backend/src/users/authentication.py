@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from main import metrics
+
+from .models import UserRole
+
+User = get_user_model()
+
+USER_CLAIMS = (
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "is_staff",
+    "is_superuser",
+)
+
+
+class RoleTokenAuthentication(TokenAuthentication):
+    """Token authentication that loads the user's role in the same query.
+
+    Permission checks read ``request.user.userrole``, which would otherwise
+    cost one more query on every authenticated request.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related("user", "user__userrole").get(
+                key=key
+            )
+        except model.DoesNotExist:
+            metrics.auth_lookups.labels("token", "invalid").inc()
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            metrics.auth_lookups.labels("token", "inactive").inc()
+            raise exceptions.AuthenticationFailed(
+                _("User inactive or deleted.")
+            )
+
+        metrics.auth_lookups.labels("token", "ok").inc()
+        return (token.user, token)
+
+
+class RoleJWTAuthentication(JWTAuthentication):
+    """Stateless authentication with access tokens from ``issue_tokens``.
+
+    The user is rebuilt from the token claims as a model instance whose
+    other fields are deferred, so ORM lookups by ``request.user`` work and
+    the database is only hit when a view reads a field the token lacks.
+    """
+
+    def get_validated_token(self, raw_token):
+        try:
+            return super().get_validated_token(raw_token)
+        except InvalidToken:
+            metrics.auth_lookups.labels("jwt", "invalid").inc()
+            raise
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+            role = validated_token["role"]
+            values = {claim: validated_token[claim] for claim in USER_CLAIMS}
+        except KeyError:
+            metrics.auth_lookups.labels("jwt", "invalid").inc()
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+
+        values["id"] = user_id
+        field_names = [
+            field.attname
+            for field in User._meta.concrete_fields
+            if field.attname in values
+        ]
+        user = User.from_db(
+            User.objects.db,
+            field_names,
+            [values[name] for name in field_names],
+        )
+        user.userrole = UserRole(role=role)
+        metrics.auth_lookups.labels("jwt", "ok").inc()
+        return user
+
+
+def add_role_claims(token, user):
+    token["role"] = user.userrole.role
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def issue_tokens(user):
+    """Return a refresh token and its access token with role claims."""
+    refresh = add_role_claims(RefreshToken.for_user(user), user)
+    return {"refresh": str(refresh), "access": str(refresh.access_token)}
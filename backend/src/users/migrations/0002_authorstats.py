@@ -0,0 +1,59 @@
+# Generated by Django 2.2.28 on 2026-10-18 13:57
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FILL_AUTHOR_STATS = """
+INSERT INTO users_authorstats (user_id, recipes_count, followers_count)
+SELECT
+    author.id,
+    (SELECT COUNT(*) FROM recipes_recipe WHERE author_id = author.id),
+    (SELECT COUNT(*) FROM users_follow WHERE author_id = author.id)
+FROM auth_user AS author;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0008_shopping_list_ingredient"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorStats",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор",
+                    ),
+                ),
+                (
+                    "recipes_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество рецептов"
+                    ),
+                ),
+                (
+                    "followers_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество подписчиков"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика автора",
+                "verbose_name_plural": "Статистика авторов",
+            },
+        ),
+        migrations.RunSQL(FILL_AUTHOR_STATS, migrations.RunSQL.noop),
+    ]
@@ -31,18 +31,15 @@ class UserRole(models.Model):
 
     @property
     def is_moderator(self):
-        return any(
-            (
-                self.user.is_superuser,
-                self.user.is_staff,
-                self.role == self.MODERATOR,
-                self.role == self.ADMIN,
-            )
+        return (
+            self.role in (self.MODERATOR, self.ADMIN)
+            or self.user.is_staff
+            or self.user.is_superuser
         )
 
     @property
     def is_admin(self):
-        return any((self.user.is_superuser, self.role == self.ADMIN))
+        return self.role == self.ADMIN or self.user.is_superuser
 
 
 class Follow(models.Model):
@@ -72,3 +69,25 @@ class Follow(models.Model):
                 name="self_follow_restriction",
             ),
         ]
+
+
+class AuthorStats(models.Model):
+    user = models.OneToOneField(
+        to=User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name="Автор",
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество рецептов",
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Количество подписчиков",
+    )
+
+    class Meta:
+        verbose_name = "Статистика автора"
+        verbose_name_plural = "Статистика авторов"
@@ -1,11 +1,19 @@
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core import exceptions as django_exceptions
+from django.db import models
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
 from recipes.models import Recipe
 
+from .authentication import add_role_claims
 from .models import Follow
 
 User = get_user_model()
@@ -44,6 +52,56 @@ class UserCreationSerializer(UserCreateSerializer):
         return attrs
 
 
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh the access token with the user's current role claims.
+
+    This is the only JWT request that reads the user, so role changes and
+    deactivation take effect within one access token lifetime.
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs["refresh"])
+        user = (
+            User.objects.select_related("userrole")
+            .filter(
+                **{
+                    api_settings.USER_ID_FIELD: refresh[
+                        api_settings.USER_ID_CLAIM
+                    ],
+                    "is_active": True,
+                }
+            )
+            .first()
+        )
+        if user is None:
+            raise InvalidToken("Пользователь не найден или неактивен")
+
+        attrs["refresh"] = str(add_role_claims(refresh, user))
+        return super().validate(attrs)
+
+
+class UserListSerializer(serializers.ListSerializer):
+    """Look up the subscriptions to every user on the page in one query."""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        users = list(iterable)
+
+        request = self.context.get("request")
+        followed = set()
+        if request and request.user.is_authenticated:
+            followed = set(
+                Follow.objects.filter(
+                    follower=request.user, author__in=users
+                ).values_list("author_id", flat=True)
+            )
+        for user in users:
+            if not hasattr(user, "is_subscribed"):
+                user.is_subscribed = user.pk in followed
+
+        return super().to_representation(users)
+
+
 class CustomUserSerializer(UserSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -57,8 +115,12 @@ class CustomUserSerializer(UserSerializer):
             "last_name",
             "is_subscribed",
         )
+        list_serializer_class = UserListSerializer
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
+
         request = self.context.get("request")
         if not request or request.user.is_anonymous:
             return False
@@ -75,6 +137,26 @@ class FollowRecipeSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "image", "cooking_time")
 
 
+class FollowListSerializer(serializers.ListSerializer):
+    """Load the recipes of every author on the page in one query."""
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        authors = list(iterable)
+        limit = self.child.get_recipes_limit()
+
+        newest = defaultdict(list)
+        recipes = Recipe.objects.only(
+            "id", "name", "image", "cooking_time", "author_id"
+        ).newest_per_author([author.pk for author in authors], limit)
+        for recipe in recipes:
+            newest[recipe.author_id].append(recipe)
+        for author in authors:
+            author.newest_recipes = newest[author.pk]
+
+        return super().to_representation(authors)
+
+
 class FollowSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     recipes = serializers.SerializerMethodField(read_only=True)
@@ -92,22 +174,36 @@ class FollowSerializer(serializers.ModelSerializer):
             "recipes",
             "recipes_count",
         )
+        list_serializer_class = FollowListSerializer
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
+
         user = self.context.get("request").user
         if not user:
             return False
         return Follow.objects.filter(follower=user, author=obj).exists()
 
-    def get_recipes(self, obj):
-        request = self.context.get("request")
-        limit_recipes = request.query_params.get("recipes_limit")
-        recipes = obj.recipes.all()
-
-        if limit_recipes:
-            recipes[: int(limit_recipes)]
+    def get_recipes_limit(self):
+        limit = self.context["request"].query_params.get("recipes_limit")
+        if limit is None:
+            return None
+        if not limit.isdigit():
+            raise serializers.ValidationError(
+                {"recipes_limit": "Укажите неотрицательное целое число"}
+            )
+        return int(limit)
 
-        context = {"request": request}
+    def get_recipes(self, obj):
+        recipes = getattr(obj, "newest_recipes", None)
+        if recipes is None:
+            recipes = obj.recipes.all()
+            limit = self.get_recipes_limit()
+            if limit is not None:
+                recipes = recipes[:limit]
+
+        context = {"request": self.context.get("request")}
         return FollowRecipeSerializer(
             instance=recipes,
             many=True,
@@ -115,4 +211,4 @@ class FollowSerializer(serializers.ModelSerializer):
         ).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.stats.recipes_count
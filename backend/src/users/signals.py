@@ -1,8 +1,13 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
-from .models import UserRole
+from main.conditional import bump_versions, user_scope
+
+from .models import AuthorStats, Follow, UserRole
+
+PUBLIC_PROFILE_FIELDS = {"email", "username", "first_name", "last_name"}
 
 
 @receiver(post_save, sender=User)
@@ -11,6 +16,12 @@ def setup_role(sender, instance, created, **kwargs):
         UserRole.objects.create(user=instance)
 
 
+@receiver(post_save, sender=User)
+def setup_stats(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.create(user=instance)
+
+
 @receiver(post_save, sender=UserRole)
 def setup_role_permissions(sender, instance, created, **kwargs):
     if instance.role == UserRole.USER:
@@ -26,3 +37,53 @@ def setup_role_permissions(sender, instance, created, **kwargs):
         instance.user.is_staff = True
 
     instance.user.save()
+
+
+@receiver(pre_save, sender=User)
+def remember_public_profile(sender, instance, update_fields=None, **kwargs):
+    """Flag saves that change what recipe cards show about the user.
+
+    Most user saves touch only ``last_login`` or the role flags, so the
+    saved public fields are compared with the stored row instead of
+    assuming every save changes them.
+    """
+    fields = PUBLIC_PROFILE_FIELDS
+    if update_fields is not None:
+        fields = fields & set(update_fields)
+    previous = (
+        User.objects.filter(pk=instance.pk).values(*sorted(fields)).first()
+        if instance.pk and fields
+        else None
+    )
+    instance.public_profile_changed = previous is not None and any(
+        previous[field] != getattr(instance, field) for field in fields
+    )
+
+
+@receiver(post_save, sender=User)
+def bump_users_version(sender, instance, created, **kwargs):
+    if created or not getattr(instance, "public_profile_changed", False):
+        return
+    if instance.recipes.exists():
+        bump_versions("users")
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follower_version(sender, instance, **kwargs):
+    bump_versions(user_scope(instance.follower_id))
+
+
+@receiver(post_save, sender=Follow)
+def count_follower(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.filter(user_id=instance.author_id).update(
+            followers_count=F("followers_count") + 1
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follower(sender, instance, **kwargs):
+    AuthorStats.objects.filter(
+        user_id=instance.author_id, followers_count__gt=0
+    ).update(followers_count=F("followers_count") - 1)
@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+
+from main.conditional import get_versions
+from recipes.cache import RECIPE_CARD_KEY
+from recipes.tests.factories import make_recipe, make_user
+from users.models import UserRole
+
+
+def users_version():
+    return get_versions("users")["users"]
+
+
+@override_settings(RECIPE_IMAGE_VARIANTS_ASYNC=False)
+class PublicProfileTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = make_user("author")
+        self.recipe = make_recipe(self.author)
+        self.reader = make_user("reader")
+        self.card_key = RECIPE_CARD_KEY.format(self.recipe.pk)
+        cache.set(self.card_key, {"id": self.recipe.pk})
+        self.version = users_version()
+
+    def test_new_user_keeps_version(self):
+        make_user("newcomer")
+
+        self.assertEqual(users_version(), self.version)
+
+    def test_author_rename_bumps_version_and_drops_cards(self):
+        self.author.first_name = "Другое"
+        self.author.save()
+
+        self.assertNotEqual(users_version(), self.version)
+        self.assertIsNone(cache.get(self.card_key))
+
+    def test_reader_rename_keeps_version(self):
+        self.reader.first_name = "Другое"
+        self.reader.save()
+
+        self.assertEqual(users_version(), self.version)
+
+    def test_save_without_changes_keeps_cards(self):
+        self.author.save()
+        self.author.last_login = self.author.date_joined
+        self.author.save(update_fields=["last_login"])
+
+        self.assertEqual(users_version(), self.version)
+        self.assertIsNotNone(cache.get(self.card_key))
+
+    def test_role_change_keeps_version(self):
+        role = UserRole.objects.get(user=self.author)
+        role.role = UserRole.MODERATOR
+        role.save()
+
+        self.assertEqual(users_version(), self.version)
+        self.assertIsNotNone(cache.get(self.card_key))
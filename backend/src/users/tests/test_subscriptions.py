@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from recipes.models import Recipe
+from recipes.tests.factories import make_recipe, make_user, token_header
+from users.models import Follow
+
+SUBSCRIPTIONS_URL = "/api/users/subscriptions/"
+
+
+class SubscriptionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = make_user("reader")
+        cls.author = make_user("author")
+        for number in range(4):
+            make_recipe(cls.author, name=f"Рецепт {number}")
+
+    def get(self, **params):
+        return self.client.get(
+            SUBSCRIPTIONS_URL, params, **token_header(self.reader)
+        )
+
+    def test_no_subscriptions(self):
+        response = self.get(recipes_limit=3)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [])
+
+    def test_recipes_limit(self):
+        Follow.objects.create(follower=self.reader, author=self.author)
+
+        response = self.get(recipes_limit=3)
+
+        self.assertEqual(response.status_code, 200)
+        (author,) = response.data["results"]
+        newest = Recipe.objects.filter(author=self.author).order_by("-id")
+        self.assertEqual(
+            [recipe["id"] for recipe in author["recipes"]],
+            list(newest.values_list("id", flat=True)[:3]),
+        )
+
+    def test_empty_author_ids(self):
+        self.assertEqual(list(Recipe.objects.newest_per_author([], 3)), [])
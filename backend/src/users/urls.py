@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
@@ -31,3 +32,17 @@ urlpatterns = [
         name="follow-author",
     ),
 ]
+
+if settings.AUTH_JWT_ENABLED:
+    urlpatterns += [
+        path(
+            route="auth/jwt/create/",
+            view=views.JWTCreateView.as_view(),
+            name="jwt-create",
+        ),
+        path(
+            route="auth/jwt/refresh/",
+            view=views.JWTRefreshView.as_view(),
+            name="jwt-refresh",
+        ),
+    ]
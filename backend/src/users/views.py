@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import BooleanField, Value
 from django.db.utils import IntegrityError
 from django.shortcuts import get_object_or_404
 from djoser.conf import settings
@@ -8,11 +9,13 @@ from djoser.views import TokenCreateView, TokenDestroyView
 from rest_framework import filters, permissions, status, viewsets
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.views import TokenRefreshView
 
-from main.pagination import LimitPageNumberPaginator
+from main.pagination import OptInCursorPaginator
 
+from .authentication import issue_tokens
 from .models import Follow
-from .serializers import FollowSerializer
+from .serializers import FollowSerializer, RoleTokenRefreshSerializer
 
 User = get_user_model()
 
@@ -27,6 +30,20 @@ class Status201TokenCreateView(TokenCreateView):
         )
 
 
+class JWTCreateView(TokenCreateView):
+    """Log in with the djoser credentials and get a JWT pair."""
+
+    def _action(self, serializer):
+        return Response(
+            data=issue_tokens(serializer.user),
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class JWTRefreshView(TokenRefreshView):
+    serializer_class = RoleTokenRefreshSerializer
+
+
 class Status201TokenDestroyView(TokenDestroyView):
     def post(self, request):
         logout_user(request)
@@ -38,7 +55,7 @@ class APIFollowView(APIView):
 
     def post(self, request, id):
         user = get_object_or_404(User, id=request.user.id)
-        author = get_object_or_404(User, id=id)
+        author = get_object_or_404(User.objects.select_related("stats"), id=id)
 
         try:
             Follow.objects.create(follower=user, author=author)
@@ -71,11 +88,17 @@ class FollowViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = User.objects.all()
     serializer_class = FollowSerializer
     permission_classes = (permissions.IsAuthenticated,)
-    pagination_class = LimitPageNumberPaginator
+    pagination_class = OptInCursorPaginator
     filter_backends = (filters.SearchFilter,)
     search_fields = ("^following__user",)
+    use_read_replica = True
 
     def get_queryset(self):
         user = self.request.user
-        new_queryset = User.objects.filter(author__follower=user)
+        new_queryset = (
+            User.objects.filter(author__follower=user)
+            .select_related("stats")
+            .annotate(is_subscribed=Value(True, output_field=BooleanField()))
+            .order_by("-author__id")
+        )
         return new_queryset